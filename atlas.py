@@ -0,0 +1,221 @@
+"""
+Texture atlas packing and loading.
+
+pack_atlas is the offline step: it packs a directory of images into one or more sheets with the MaxRects algorithm
+and writes the sheets as PNG files plus a small binary index.  load_atlas is the runtime step: it reads the index,
+opens every sheet once and hands out subsurfaces keyed by image name, the same way load_sprite_sheet does.
+
+Command line: python atlas.py <image_dir> <output_dir> [--name atlas] [--max-size 2048] [--padding 1]
+"""
+from os import path
+import os
+import struct
+import pygame
+from resource import load_image, load_sprite_sheet
+
+ATLAS_MAGIC = b'PGLA'
+ATLAS_VERSION = 1
+IMAGE_EXTENSIONS = ('.png', '.bmp', '.jpg', '.jpeg', '.gif', '.tga')
+
+_HEADER = struct.Struct('<4sHH')
+_LENGTH = struct.Struct('<H')
+_COUNT = struct.Struct('<I')
+_ENTRY = struct.Struct('<HHHHH')
+
+
+class MaxRectsBin(object):
+    """
+    MaxRects bin packer using the best short side fit heuristic
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.used_width = 0
+        self.used_height = 0
+        self._free = [pygame.Rect(0, 0, width, height)]
+
+    def insert(self, width, height):
+        """
+        Place a width*height rect
+        :param width: int
+        :param height: int
+        :return: pygame.Rect|None if it does not fit
+        """
+        best = None
+        best_short = best_long = None
+        for free in self._free:
+            if width <= free.w and height <= free.h:
+                left_w = free.w - width
+                left_h = free.h - height
+                short, long = min(left_w, left_h), max(left_w, left_h)
+                if best is None or (short, long) < (best_short, best_long):
+                    best = pygame.Rect(free.x, free.y, width, height)
+                    best_short, best_long = short, long
+        if best is None:
+            return None
+        self._split(best)
+        self.used_width = max(self.used_width, best.right)
+        self.used_height = max(self.used_height, best.bottom)
+        return best
+
+    def _split(self, used):
+        result = []
+        for free in self._free:
+            if not free.colliderect(used):
+                result.append(free)
+                continue
+            if used.x > free.x:
+                result.append(pygame.Rect(free.x, free.y, used.x - free.x, free.h))
+            if used.right < free.right:
+                result.append(pygame.Rect(used.right, free.y, free.right - used.right, free.h))
+            if used.y > free.y:
+                result.append(pygame.Rect(free.x, free.y, free.w, used.y - free.y))
+            if used.bottom < free.bottom:
+                result.append(pygame.Rect(free.x, used.bottom, free.w, free.bottom - used.bottom))
+        # drop free rects that are fully inside another one
+        pruned = []
+        for i, a in enumerate(result):
+            contained = False
+            for j, b in enumerate(result):
+                if i != j and b.contains(a) and (a != b or j < i):
+                    contained = True
+                    break
+            if not contained:
+                pruned.append(a)
+        self._free = pruned
+
+
+def _find_images(image_dir):
+    found = []
+    for root, dirs, files in os.walk(image_dir):
+        dirs.sort()
+        for name in sorted(files):
+            stem, ext = path.splitext(name)
+            if ext.lower() in IMAGE_EXTENSIONS:
+                full_path = path.join(root, name)
+                key = path.splitext(path.relpath(full_path, image_dir))[0].replace(os.sep, '/')
+                found.append((key, full_path))
+    return found
+
+
+def pack_atlas(image_dir, output_dir, name='atlas', max_size=2048, padding=1):
+    """
+    Pack every image under image_dir into sheets of at most max_size*max_size and write them with an index
+    :param image_dir: directory of images, keys are paths relative to it without extension using / separators
+    :param output_dir: directory for <name>_<n>.png sheets and <name>.atlas
+    :param name: str
+    :param max_size: int
+    :param padding: int pixels left between images
+    :return: str path of the index file
+    """
+    if not path.isdir(image_dir):
+        raise FileNotFoundError("Expected image directory {} was not found".format(image_dir))
+    images = [(key, pygame.image.load(full_path)) for key, full_path in _find_images(image_dir)]
+    for key, surface in images:
+        w, h = surface.get_size()
+        if w + padding > max_size or h + padding > max_size:
+            raise ValueError("Image {} is {}x{} and does not fit in a {} atlas".format(key, w, h, max_size))
+    # big images first packs tighter
+    images.sort(key=lambda i: (max(i[1].get_size()), i[1].get_width() * i[1].get_height()), reverse=True)
+    bins = []
+    placed = []
+    for key, surface in images:
+        w, h = surface.get_size()
+        for index, b in enumerate(bins):
+            rect = b.insert(w + padding, h + padding)
+            if rect is not None:
+                break
+        else:
+            bins.append(MaxRectsBin(max_size, max_size))
+            index = len(bins) - 1
+            rect = bins[index].insert(w + padding, h + padding)
+        placed.append((key, surface, index, pygame.Rect(rect.x, rect.y, w, h)))
+    os.makedirs(output_dir, exist_ok=True)
+    sheet_names = []
+    sheets = []
+    for index, b in enumerate(bins):
+        sheets.append(pygame.Surface((max(b.used_width, 1), max(b.used_height, 1)), pygame.SRCALPHA, 32))
+        sheet_names.append("{}_{}.png".format(name, index))
+    for key, surface, index, rect in placed:
+        sheets[index].blit(surface, rect)
+    for sheet, sheet_name in zip(sheets, sheet_names):
+        pygame.image.save(sheet, path.join(output_dir, sheet_name))
+    index_path = path.join(output_dir, "{}.atlas".format(name))
+    with open(index_path, "wb") as handle:
+        handle.write(_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(sheet_names)))
+        for sheet_name in sheet_names:
+            encoded = sheet_name.encode('utf-8')
+            handle.write(_LENGTH.pack(len(encoded)) + encoded)
+        handle.write(_COUNT.pack(len(placed)))
+        for key, surface, index, rect in placed:
+            encoded = key.encode('utf-8')
+            handle.write(_ENTRY.pack(index, rect.x, rect.y, rect.w, rect.h) + _LENGTH.pack(len(encoded)) + encoded)
+    return index_path
+
+
+def read_atlas_index(atlas_file):
+    """
+    Read an atlas index
+    :param atlas_file: full path of a .atlas file
+    :return: (list of sheet file names, list of dicts of key to pygame.Rect, one per sheet)
+    """
+    if not path.isfile(atlas_file):
+        raise FileNotFoundError("Expected atlas file {} was not found".format(atlas_file))
+    with open(atlas_file, "rb") as handle:
+        data = handle.read()
+    magic, version, sheet_count = _HEADER.unpack_from(data, 0)
+    if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+        raise ValueError("{} is not a version {} atlas file".format(atlas_file, ATLAS_VERSION))
+    offset = _HEADER.size
+    sheet_names = []
+    for _ in range(0, sheet_count):
+        length, = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        sheet_names.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+    count, = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    maps = [{} for _ in range(0, sheet_count)]
+    for _ in range(0, count):
+        index, x, y, w, h = _ENTRY.unpack_from(data, offset)
+        offset += _ENTRY.size
+        length, = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        maps[index][data[offset:offset + length].decode('utf-8')] = pygame.Rect(x, y, w, h)
+        offset += length
+    return sheet_names, maps
+
+
+def load_atlas(atlas_file, image_manager=None, use_alpha=True):
+    """
+    Load every sheet of an atlas once and cut it into subsurfaces keyed by image name
+    :param atlas_file: full path of a .atlas file
+    :param image_manager: ImageManager to add the images to, None returns them as a dict
+    :param use_alpha: bool convert sheets with convert_alpha
+    :return: dict of key to pygame.Surface|None when an image_manager is given
+    """
+    sheet_names, maps = read_atlas_index(atlas_file)
+    atlas_dir = path.dirname(atlas_file)
+    images = {}
+    for sheet_name, sheet_map in zip(sheet_names, maps):
+        sheet = load_image(atlas_dir, sheet_name, use_alpha=use_alpha)
+        if image_manager is None:
+            images.update(load_sprite_sheet(sheet, sheet_map))
+        else:
+            load_sprite_sheet(sheet, sheet_map, image_manager)
+    if image_manager is None:
+        return images
+    return None
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Pack a directory of images into texture atlas sheets")
+    parser.add_argument('image_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--name', default='atlas')
+    parser.add_argument('--max-size', type=int, default=2048)
+    parser.add_argument('--padding', type=int, default=1)
+    args = parser.parse_args()
+    print(pack_atlas(args.image_dir, args.output_dir, args.name, args.max_size, args.padding))
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for building a LinkedList with add() and reading len().
+
+Compares the current LinkedList against a copy of the original tail-walking implementation.  Run from the repository
+root with `python benchmarks/bench_linked_list.py`.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from container import LinkedList  # noqa: E402
+
+
+class _WalkingNode(object):
+
+    def __init__(self, data, next_node=None):
+        self.data = data
+        self.next_node = next_node
+
+
+class WalkingLinkedList(object):
+    """
+    The original LinkedList behaviour: add walks to the tail and len counts every node
+    """
+
+    def __init__(self):
+        self._head = None
+
+    def __len__(self):
+        c = 0
+        n = self._head
+        while n is not None:
+            n = n.next_node
+            c += 1
+        return c
+
+    def add(self, value):
+        if self._head is None:
+            self._head = _WalkingNode(value)
+            return
+        n = self._head
+        while n.next_node is not None:
+            n = n.next_node
+        n.next_node = _WalkingNode(value)
+
+
+def build(cls, size):
+    ll = cls()
+    for i in range(0, size):
+        ll.add(i)
+    return len(ll)
+
+
+def main():
+    print("{:>8} {:>14} {:>14}".format("size", "walking (s)", "tail (s)"))
+    for size in (1000, 2000, 4000, 8000, 100000):
+        walking = timeit.timeit(lambda: build(WalkingLinkedList, size), number=1) if size <= 8000 else float('nan')
+        tail = timeit.timeit(lambda: build(LinkedList, size), number=1)
+        print("{:>8} {:>14.4f} {:>14.4f}".format(size, walking, tail))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Broad-phase collision benchmark: SpatialHash against the naive pygame.Rect.colliderect loop.
+
+Every frame each rect moves, the index is updated and all overlapping pairs are collected.  The naive loop is only
+timed in full up to 10k rects; above that a sample of rows is timed and scaled up.  Run from the repository root
+with `python benchmarks/bench_spatial_hash.py`.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pygame import Rect  # noqa: E402
+from container import SpatialHash  # noqa: E402
+
+WORLD = 4000
+FRAMES = 3
+
+
+def make_rects(count, seed=1):
+    rng = random.Random(seed)
+    rects = [Rect(rng.randint(0, WORLD), rng.randint(0, WORLD), rng.randint(4, 24), rng.randint(4, 24))
+             for _ in range(0, count)]
+    velocities = [(rng.randint(-3, 3), rng.randint(-3, 3)) for _ in range(0, count)]
+    return rects, velocities
+
+
+def naive_pairs(rects, rows=None):
+    pairs = 0
+    n = len(rects)
+    for i in range(0, n if rows is None else rows):
+        a = rects[i]
+        for j in range(i + 1, n):
+            if a.colliderect(rects[j]):
+                pairs += 1
+    return pairs
+
+
+def bench_naive(count):
+    rects, velocities = make_rects(count)
+    rows = None if count <= 10000 else 500
+    start = time.perf_counter()
+    for _ in range(0, FRAMES):
+        for r, (vx, vy) in zip(rects, velocities):
+            r.move_ip(vx, vy)
+        naive_pairs(rects, rows)
+    elapsed = (time.perf_counter() - start) / FRAMES
+    if rows is not None:
+        # rows i cost (n - i) comparisons, scale the sampled rows up to the full triangle
+        sampled = sum(count - i - 1 for i in range(0, rows))
+        elapsed *= (count * (count - 1) / 2.0) / sampled
+    return elapsed, rows is not None
+
+
+def bench_hash(count, cell_size=32):
+    rects, velocities = make_rects(count)
+    grid = SpatialHash(cell_size)
+    for i, r in enumerate(rects):
+        grid.insert(i, r)
+    start = time.perf_counter()
+    for _ in range(0, FRAMES):
+        for i, r in enumerate(rects):
+            vx, vy = velocities[i]
+            r.move_ip(vx, vy)
+            grid.move(i, r)
+        sum(1 for _ in grid.pairs())
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    print("{:>8} {:>16} {:>16}".format("rects", "naive (s/frame)", "hash (s/frame)"))
+    for count in (1000, 10000, 50000):
+        naive, estimated = bench_naive(count)
+        hashed = bench_hash(count)
+        print("{:>8} {:>15.4f}{} {:>16.4f}".format(count, naive, "*" if estimated else " ", hashed))
+    print("* estimated from a sample of rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for drawing HUD text.
+
+Compares Font.render plus a blit against TextRenderer.draw with a cache hit, TextRenderer.draw(cache=False) for text
+that changes every frame, and blitting pre-rendered glyphs one by one (the glyph atlas approach TextRenderer does not
+use because it loses to Font.render).  Run from the repository root with `python benchmarks/bench_text.py`.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+from manager import FontManager  # noqa: E402
+from resource import load_font  # noqa: E402
+from text import TextRenderer  # noqa: E402
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests", "test_resources")
+WHITE = (255, 255, 255)
+
+
+def glyph_blits(font, text):
+    """
+    Pre-render every character of text and return a draw function that blits them one by one
+    """
+    glyphs = {ch: font.render(ch, True, WHITE) for ch in set(text)}
+
+    def draw(target):
+        x = 0
+        blits = []
+        for ch in text:
+            glyph = glyphs[ch]
+            blits.append((glyph, (x, 0)))
+            x += glyph.get_width()
+        target.blits(blits, doreturn=False)
+    return draw
+
+
+def main():
+    pygame.init()
+    target = pygame.display.set_mode((800, 100))
+    number = 5000
+    print("{:>5} {:>6} {:>14} {:>14} {:>14} {:>14}".format("size", "chars", "Font.render", "cached draw",
+                                                             "cache=False", "glyph blits"))
+    for size in (16, 32):
+        font = load_font(FONT_DIR, "trebuc", size)
+        fm = FontManager()
+        fm.add_font('hud', font)
+        renderer = TextRenderer(fm)
+        for text in ("1234", "Score: 123456", "Score: 1234567  Time: 03:21.45"):
+            glyphs = glyph_blits(font, text)
+            results = [
+                timeit.timeit(lambda: target.blit(font.render(text, True, WHITE), (0, 0)), number=number),
+                timeit.timeit(lambda: renderer.draw(target, 'hud', text, (0, 0), WHITE), number=number),
+                timeit.timeit(lambda: renderer.draw(target, 'hud', text, (0, 0), WHITE, cache=False), number=number),
+                timeit.timeit(lambda: glyphs(target), number=number),
+            ]
+            print("{:>5} {:>6} {:>12.1f}us {:>12.1f}us {:>12.1f}us {:>12.1f}us".format(
+                size, len(text), *(r / number * 1e6 for r in results)))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
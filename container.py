@@ -1,21 +1,44 @@
+import asyncio
+import threading
+import time
+from array import array
+from collections import deque
+from queue import Empty, Full
+from optional import resolve_use_numpy
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, EntityTable falls back to array.array columns without it
+    numpy = None
+
+
 class Node(object):
     """
-    LinkedList node, contains an object (data) and a reference to the next node (no node if None)
+    LinkedList node, contains an object (data) and references to the next and previous nodes (no node if None).
+    The nodes returned by LinkedList insert methods double as handles for O(1) insert_after, insert_before and remove.
+    owner is the LinkedList the node is linked into, None once it has been removed.
     """
+    __slots__ = ('data', 'next_node', 'prev_node', 'owner')
 
-    def __init__(self, data, next_node=None):
+    def __init__(self, data, next_node=None, prev_node=None, owner=None):
         self.data = data
         self.next_node = next_node
+        self.prev_node = prev_node
+        self.owner = owner
 
 
 class LinkedList(object):
     """
-    Node-based linked list implemented in pure Python
+    Node-based doubly linked list implemented in pure Python
+
+    Keeps a reference to the last node and a running size so add, appendleft, popleft and len() are O(1).  Insert
+    methods return the new Node, which can be passed back to insert_after, insert_before and remove for O(1) updates.
     """
 
     def __init__(self):
         self._head = None
-        self._tmp = None
+        self._tail = None
+        self._size = 0
 
     def is_empty(self):
         """
@@ -29,90 +52,229 @@ class LinkedList(object):
         Implements data model to allow len() built in call on the object
         :return: int
         """
-        c = 0
+        return self._size
+
+    def __iter__(self):
+        """
+        Implements data model to allow `for N in LL` built in call on the object.  Every call returns an independent
+        iterator so loops can be nested.  Deleting objects while iterating is safe, the current one or any other:
+        removed objects that have not been reached yet are skipped.
+        :return: generator
+        """
         n = self._head
         while n is not None:
-            n = n.next_node
-            c += 1
-        return c
+            yield n.data
+            n = self._advance(n.next_node)
 
-    def __iter__(self):
+    def __reversed__(self):
         """
-        Implements data model to allow `for N in LL` built in call on the object
-        :return: LinkedList
+        Implements data model to allow reversed() built in call on the object
+        :return: generator
         """
-        self._tmp = self._head
-        return self
+        n = self._tail
+        while n is not None:
+            yield n.data
+            n = n.prev_node
+            while n is not None and n.owner is not self:
+                n = n.prev_node
 
-    def __next__(self):
+    def iter_removable(self):
         """
-        Implements data model to allow `for N in LL` next method for built in iteration
-        :return: Next node until nodes are exhausted, then raises StopIteration
+        Iterator whose remove() method unlinks the object last returned, for one pass update loops e.g.
+        `it = ll.iter_removable()` then `for e in it: if e.expired: it.remove()`
+        :return: iterator with a remove() method
         """
-        t = self._tmp
-        if t is None:
-            raise StopIteration
+        return _RemovableIterator(self)
+
+    def remove_if(self, predicate):
+        """
+        Delete every object for which predicate(object) is true in a single pass
+        :param predicate: callable
+        :return: int number of objects deleted
+        """
+        removed = 0
+        n = self._head
+        while n is not None:
+            # the predicate may itself remove nodes, including this one
+            if predicate(n.data) and n.owner is self:
+                self._unlink(n)
+                removed += 1
+            n = self._advance(n.next_node)
+        return removed
+
+    def _advance(self, n):
+        """
+        Skip forward past nodes that were unlinked, e.g. by the body of a loop iterating the list
+        :param n: Node|None
+        :return: Node|None first node still in the list
+        """
+        while n is not None and n.owner is not self:
+            n = n.next_node
+        return n
+
+    def _check_handle(self, handle):
+        if handle.owner is not self:
+            raise ValueError("Node is not part of this LinkedList")
+
+    def _unlink(self, n):
+        """
+        Unlinks a node.  next_node and prev_node are left alone so iterators paused on the node can carry on, owner
+        is cleared so they know to skip it.
+        :param n: Node
+        :return: None
+        """
+        p = n.prev_node
+        nxt = n.next_node
+        if p is None:
+            self._head = nxt
+        else:
+            p.next_node = nxt
+        if nxt is None:
+            self._tail = p
+        else:
+            nxt.prev_node = p
+        n.owner = None
+        self._size -= 1
+
+    def _insert_after(self, n, value):
+        s = Node(value, n.next_node, n, self)
+        if n.next_node is None:
+            self._tail = s
         else:
-            self._tmp = self._tmp.next_node
-            return t.data
+            n.next_node.prev_node = s
+        n.next_node = s
+        self._size += 1
+        return s
+
+    def _insert_before(self, n, value):
+        s = Node(value, n, n.prev_node, self)
+        if n.prev_node is None:
+            self._head = s
+        else:
+            n.prev_node.next_node = s
+        n.prev_node = s
+        self._size += 1
+        return s
 
     def add(self, value):
         """
-        Add a new node
+        Add a new node to the end of the list
         :param value: object
-        :return: None
+        :return: Node handle
+        """
+        if self._tail is None:
+            n = Node(value, owner=self)
+            self._head = n
+            self._tail = n
+            self._size += 1
+            return n
+        return self._insert_after(self._tail, value)
+
+    def appendleft(self, value):
+        """
+        Add a new node to the front of the list
+        :param value: object
+        :return: Node handle
         """
         if self._head is None:
-            self._head = Node(value, None)
-            return
+            return self.add(value)
+        return self._insert_before(self._head, value)
+
+    def popleft(self):
+        """
+        Remove and return the object at the front of the list
+        :return: object|None if empty
+        """
         n = self._head
-        p = None
-        while True:
-            if n is None:
-                p.next_node = Node(value)
-                break
+        if n is None:
+            return None
+        self._unlink(n)
+        return n.data
+
+    def extend(self, values):
+        """
+        Add every object of an iterable to the end of the list
+        :param values: iterable
+        :return: None
+        """
+        head = None
+        tail = None
+        count = 0
+        for value in values:
+            n = Node(value, None, tail, self)
+            if tail is None:
+                head = n
             else:
-                p = n
-                n = n.next_node
+                tail.next_node = n
+            tail = n
+            count += 1
+        if head is None:
+            return
+        if self._tail is None:
+            self._head = head
+        else:
+            self._tail.next_node = head
+            head.prev_node = self._tail
+        self._tail = tail
+        self._size += count
+
+    def insert_after(self, handle, value):
+        """
+        Insert a new node directly after a node handle in O(1)
+        :param handle: Node returned by one of the insert methods
+        :param value: object to insert
+        :return: Node handle
+        """
+        self._check_handle(handle)
+        return self._insert_after(handle, value)
+
+    def insert_before(self, handle, value):
+        """
+        Insert a new node directly before a node handle in O(1)
+        :param handle: Node returned by one of the insert methods
+        :param value: object to insert
+        :return: Node handle
+        """
+        self._check_handle(handle)
+        return self._insert_before(handle, value)
+
+    def remove(self, handle):
+        """
+        Remove a node handle from the list in O(1)
+        :param handle: Node returned by one of the insert methods
+        :return: object held by the node
+        """
+        self._check_handle(handle)
+        self._unlink(handle)
+        return handle.data
 
     def after(self, check, value):
         """
         Insert a new node after a specific value/object
         :param check: object to insert after
         :param value: object to insert
-        :return: None
+        :return: Node handle|None if check was not found
         """
         n = self._head
-        s = Node(value, None)
         while n is not None:
             if n.data == check:
-                s.next_node = n.next_node
-                n.next_node = s
-                break
-            else:
-                n = n.next_node
+                return self._insert_after(n, value)
+            n = n.next_node
+        return None
 
     def before(self, check, value):
         """
         Insert a new node before a specific value/object
         :param check: object to insert before
         :param value: object to insert
-        :return: None
+        :return: Node handle|None if check was not found
         """
         n = self._head
-        p = None
-        s = Node(value, None)
         while n is not None:
             if n.data == check:
-                s.next_node = n
-                if p is None:
-                    self._head = s
-                else:
-                    p.next_node = s
-                break
-            else:
-                p = n
-                n = n.next_node
+                return self._insert_before(n, value)
+            n = n.next_node
+        return None
 
     def delete(self, check):
         """
@@ -121,17 +283,11 @@ class LinkedList(object):
         :return: None
         """
         n = self._head
-        p = None
         while n is not None:
             if n.data == check:
-                if p is None:
-                    self._head = n.next_node
-                else:
-                    p.next_node = n.next_node
+                self._unlink(n)
                 break
-            else:
-                p = n
-                n = n.next_node
+            n = n.next_node
 
     def debug_out(self):
         """
@@ -152,18 +308,70 @@ class LinkedList(object):
         :return: LinkedList
         """
         c = LinkedList()
-        for n in self:
-            c.add(n)
+        c.extend(self)
         return c
 
 
+class _RemovableIterator(object):
+    """
+    Iterator over a LinkedList that can unlink the object it returned last, see LinkedList.iter_removable
+    """
+    __slots__ = ('_list', '_node', '_last', '_started')
+
+    def __init__(self, linked_list):
+        self._list = linked_list
+        self._node = None
+        self._last = None
+        self._started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._started:
+            self._started = True
+            n = self._list._head
+        elif self._last is None:
+            n = None
+        else:
+            # read the link only now so objects removed since the last call are skipped
+            n = self._list._advance(self._last.next_node)
+        self._last = n
+        self._node = n
+        if n is None:
+            raise StopIteration
+        return n.data
+
+    def remove(self):
+        """
+        Delete the object last returned by the iterator from the list
+        :return: None
+        """
+        n = self._node
+        if n is None:
+            raise RuntimeError("remove() must follow a call to next() and can only be called once per object")
+        self._list._unlink(n)
+        self._node = None
+
+
 class Queue(object):
     """
-    First In First Out (FIFO) queue implementation in pure python
+    First In First Out (FIFO) queue implementation in pure python, backed by collections.deque
+
+    max_size limits the number of queued objects (0 is unlimited).  overflow decides what happens when a full queue
+    receives a new object: 'raise' raises a RuntimeError like Stack, 'drop_oldest' discards the object at the front
+    of the queue and 'drop_newest' discards the incoming object.
     """
 
-    def __init__(self):
-        self._queue = []
+    OVERFLOW_POLICIES = ('raise', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, max_size=0, overflow='raise'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError("Queue overflow must be one of {} not {}".format(self.OVERFLOW_POLICIES, overflow))
+        self._max_size = max_size
+        self._overflow = overflow
+        # deque drops from the front on its own once maxlen is reached
+        self._queue = deque(maxlen=max_size if max_size != 0 and overflow == 'drop_oldest' else None)
 
     def enqueue(self, obj):
         """
@@ -171,24 +379,59 @@ class Queue(object):
         :param obj: object
         :return: None
         """
+        if self._max_size != 0 and self._overflow != 'drop_oldest' and len(self._queue) >= self._max_size:
+            if self._overflow == 'raise':
+                raise RuntimeError("Queue size exceeds maximum set queue size")
+            return
         self._queue.append(obj)
 
+    def enqueue_many(self, objs):
+        """
+        Add several objects to the Queue in order.  With the 'raise' policy nothing is added if they do not all fit.
+        :param objs: iterable
+        :return: None
+        """
+        if self._max_size == 0 or self._overflow == 'drop_oldest':
+            self._queue.extend(objs)
+            return
+        objs = list(objs)
+        room = self._max_size - len(self._queue)
+        if len(objs) > room:
+            if self._overflow == 'raise':
+                raise RuntimeError("Queue size exceeds maximum set queue size")
+            objs = objs[:max(room, 0)]
+        self._queue.extend(objs)
+
     def dequeue(self):
         """
         Remove and return next object in queue
         :return: object|None if empty
         """
-        if self.count() > 0:
-            return self._queue.pop(0)
+        if self._queue:
+            return self._queue.popleft()
         else:
             return None
 
+    def drain(self, n=None):
+        """
+        Remove and return up to n objects in queue order, or every object if n is None
+        :param n: int|None
+        :return: list
+        """
+        q = self._queue
+        if n is None or n >= len(q):
+            objs = list(q)
+            q.clear()
+            return objs
+        popleft = q.popleft
+        return [popleft() for _ in range(0, n)]
+
     def peek(self):
         """
         Return next object without removing it from the queue
         :return: object|None if empty
         """
-        if self.count() > 0:
+        if self._queue:
             return self._queue[0]
         else:
             return None
@@ -208,6 +451,198 @@ class Queue(object):
         return len(self._queue)
 
 
+class ThreadSafeQueue(Queue):
+    """
+    Queue that can be shared between threads, e.g. loader threads handing decoded assets to the main loop
+
+    Every Queue method takes an internal lock.  get() blocks until an object is available (or timeout seconds pass)
+    and put() on a full 'raise' queue blocks until there is room, so consumers do not need to poll count().
+    """
+
+    def __init__(self, max_size=0, overflow='raise'):
+        super().__init__(max_size, overflow)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def _is_full(self):
+        return self._max_size != 0 and self._overflow == 'raise' and len(self._queue) >= self._max_size
+
+    def enqueue(self, obj):
+        with self._lock:
+            super().enqueue(obj)
+            self._not_empty.notify()
+
+    def enqueue_many(self, objs):
+        with self._lock:
+            super().enqueue_many(objs)
+            self._not_empty.notify_all()
+
+    def dequeue(self):
+        with self._lock:
+            obj = super().dequeue()
+            self._not_full.notify()
+            return obj
+
+    def drain(self, n=None):
+        with self._lock:
+            objs = super().drain(n)
+            self._not_full.notify_all()
+            return objs
+
+    def peek(self):
+        with self._lock:
+            return super().peek()
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._not_full.notify_all()
+
+    def count(self):
+        with self._lock:
+            return super().count()
+
+    def _wait(self, condition, ready, block, timeout, error):
+        if not block:
+            if not ready():
+                raise error
+            return
+        if timeout is None:
+            while not ready():
+                condition.wait()
+            return
+        deadline = time.monotonic() + timeout
+        while not ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise error
+            condition.wait(remaining)
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the next object, waiting for one if the queue is empty
+        :param block: bool, if False raise queue.Empty right away when empty
+        :param timeout: float|None seconds to wait before raising queue.Empty, None waits forever
+        :return: object
+        """
+        with self._not_empty:
+            self._wait(self._not_empty, lambda: len(self._queue) > 0, block, timeout, Empty)
+            obj = self._queue.popleft()
+            self._not_full.notify()
+            return obj
+
+    def get_nowait(self):
+        """
+        Remove and return the next object without waiting
+        :return: object, raises queue.Empty if the queue is empty
+        """
+        return self.get(False)
+
+    def put(self, obj, block=True, timeout=None):
+        """
+        Add an object, waiting for room if this is a full queue with the 'raise' overflow policy
+        :param obj: object
+        :param block: bool, if False raise queue.Full right away when full
+        :param timeout: float|None seconds to wait before raising queue.Full, None waits forever
+        :return: None
+        """
+        with self._not_full:
+            self._wait(self._not_full, lambda: not self._is_full(), block, timeout, Full)
+            Queue.enqueue(self, obj)
+            self._not_empty.notify()
+
+
+class AsyncQueue(Queue):
+    """
+    Queue for asyncio code with awaitable get() and put()
+
+    The synchronous Queue methods keep working and wake waiting coroutines, so callbacks can enqueue without awaiting.
+    Like asyncio.Queue it is not thread-safe, use it from the event loop thread.
+    """
+
+    def __init__(self, max_size=0, overflow='raise'):
+        super().__init__(max_size, overflow)
+        self._getters = deque()
+        self._putters = deque()
+
+    def _is_full(self):
+        return self._max_size != 0 and self._overflow == 'raise' and len(self._queue) >= self._max_size
+
+    @staticmethod
+    def _wake(waiters, all_waiters=False):
+        while waiters:
+            w = waiters.popleft()
+            if not w.done():
+                w.set_result(None)
+                if not all_waiters:
+                    break
+
+    async def _wait(self, waiters):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            waiter.cancel()
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                # already woken, pass the wake up on so it is not lost
+                self._wake(waiters)
+            raise
+
+    def enqueue(self, obj):
+        super().enqueue(obj)
+        self._wake(self._getters)
+
+    def enqueue_many(self, objs):
+        super().enqueue_many(objs)
+        self._wake(self._getters, True)
+
+    def dequeue(self):
+        obj = super().dequeue()
+        self._wake(self._putters)
+        return obj
+
+    def drain(self, n=None):
+        objs = super().drain(n)
+        self._wake(self._putters, True)
+        return objs
+
+    def clear(self):
+        super().clear()
+        self._wake(self._putters, True)
+
+    async def get(self):
+        """
+        Remove and return the next object, waiting for one if the queue is empty
+        :return: object
+        """
+        while not self._queue:
+            await self._wait(self._getters)
+        return self.dequeue()
+
+    def get_nowait(self):
+        """
+        Remove and return the next object without waiting
+        :return: object, raises asyncio.QueueEmpty if the queue is empty
+        """
+        if not self._queue:
+            raise asyncio.QueueEmpty
+        return self.dequeue()
+
+    async def put(self, obj):
+        """
+        Add an object, waiting for room if this is a full queue with the 'raise' overflow policy
+        :param obj: object
+        :return: None
+        """
+        while self._is_full():
+            await self._wait(self._putters)
+        self.enqueue(obj)
+
+
 class Stack(object):
     """
     Last In First Out (LIFO) stack implementation in pure python
@@ -260,3 +695,858 @@ class Stack(object):
         :return: int
         """
         return len(self._stack)
+
+
+class ObjectPool(object):
+    """
+    Free list of reusable objects, e.g. particles and bullets, so hot loops do not allocate and discard objects
+
+    size objects are created up front with factory().  acquire() hands out a free object and release() takes it back,
+    calling reset(obj) first when a reset hook is given.  When the pool is empty acquire() creates grow_by more
+    objects, unless max_size objects already exist (0 is unlimited) in which case it raises a RuntimeError like Stack.
+    stats() reports hits, misses and the high-water mark of objects in use, for sizing pools from real runs.
+    Checked out objects are tracked by id, releasing an object twice or one the pool did not hand out raises a
+    ValueError.
+    """
+
+    def __init__(self, factory, size=0, reset=None, max_size=0, grow_by=1):
+        if grow_by < 1:
+            raise ValueError("ObjectPool grow_by must be at least 1")
+        self._factory = factory
+        self._reset = reset
+        self._max_size = max_size
+        self._grow_by = grow_by
+        self._free = [factory() for _ in range(0, size)]
+        self._created = size
+        self._in_use = set()
+        self._high_water = 0
+        self._hits = 0
+        self._misses = 0
+
+    def acquire(self):
+        """
+        Take a free object from the pool, growing the pool if it is empty
+        :return: object
+        """
+        if self._free:
+            self._hits += 1
+        else:
+            self._misses += 1
+            self._grow()
+        obj = self._free.pop()
+        in_use = self._in_use
+        in_use.add(id(obj))
+        if len(in_use) > self._high_water:
+            self._high_water = len(in_use)
+        return obj
+
+    def _grow(self):
+        n = self._grow_by
+        if self._max_size != 0:
+            n = min(n, self._max_size - self._created)
+            if n <= 0:
+                raise RuntimeError("ObjectPool size exceeds maximum set pool size")
+        factory = self._factory
+        self._free.extend(factory() for _ in range(0, n))
+        self._created += n
+
+    def release(self, obj):
+        """
+        Return an object to the pool, resetting it first if the pool has a reset hook
+        :param obj: object from acquire
+        :return: None
+        """
+        try:
+            self._in_use.remove(id(obj))
+        except KeyError:
+            raise ValueError("Object was not acquired from this ObjectPool or was already released") from None
+        if self._reset is not None:
+            self._reset(obj)
+        self._free.append(obj)
+
+    def count(self):
+        """
+        Return the number of free objects in the pool
+        :return: int
+        """
+        return len(self._free)
+
+    def stats(self):
+        """
+        Return a snapshot of the pool counters
+        :return: dict
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'created': self._created,
+            'free': len(self._free),
+            'in_use': len(self._in_use),
+            'high_water': self._high_water,
+        }
+
+
+class SpatialHash(object):
+    """
+    Uniform grid spatial index for broad-phase collision
+
+    Objects are stored under every cell_size*cell_size cell their rect touches.  Rects are anything with left, top,
+    right and bottom attributes (pygame.Rect) and follow pygame.Rect semantics: right and bottom are exclusive, so
+    rects that only share an edge do not overlap, and empty rects overlap nothing.  Objects must be hashable, e.g.
+    sprites.  Queries only look at the cells the query area touches instead of every object.
+    """
+
+    def __init__(self, cell_size=64):
+        if cell_size <= 0:
+            raise ValueError("SpatialHash cell_size must be positive")
+        self._cell_size = cell_size
+        self._cells = {}
+        # obj -> (left, top, right, bottom, cx0, cy0, cx1, cy1)
+        self._items = {}
+
+    def _cell_range(self, left, top, right, bottom):
+        if right <= left or bottom <= top:
+            # empty rects never collide in pygame, keep them out of the cells so no query returns them
+            return 0, 0, -1, -1
+        cs = self._cell_size
+        cx0 = int(left // cs)
+        cy0 = int(top // cs)
+        return cx0, cy0, max(cx0, int((right - 1) // cs)), max(cy0, int((bottom - 1) // cs))
+
+    def _add_cells(self, obj, cx0, cy0, cx1, cy1):
+        cells = self._cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = {obj}
+                else:
+                    bucket.add(obj)
+
+    def _remove_cells(self, obj, cx0, cy0, cx1, cy1):
+        cells = self._cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells[(cx, cy)]
+                bucket.discard(obj)
+                if not bucket:
+                    del cells[(cx, cy)]
+
+    def insert(self, obj, rect):
+        """
+        Add an object with its rect, an object that is already indexed is moved instead
+        :param obj: hashable object
+        :param rect: pygame.Rect or anything with left, top, right and bottom
+        :return: None
+        """
+        if obj in self._items:
+            self.move(obj, rect)
+            return
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        cr = self._cell_range(left, top, right, bottom)
+        self._items[obj] = (left, top, right, bottom) + cr
+        self._add_cells(obj, *cr)
+
+    def remove(self, obj):
+        """
+        Remove an object from the index, does nothing if it is not indexed
+        :param obj: object
+        :return: None
+        """
+        item = self._items.pop(obj, None)
+        if item is not None:
+            self._remove_cells(obj, *item[4:])
+
+    def move(self, obj, rect):
+        """
+        Update the rect of an indexed object, cells are only touched when the object crosses a cell boundary
+        :param obj: object
+        :param rect: new rect
+        :return: None
+        """
+        item = self._items.get(obj)
+        if item is None:
+            self.insert(obj, rect)
+            return
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        cr = self._cell_range(left, top, right, bottom)
+        if cr != item[4:]:
+            self._remove_cells(obj, *item[4:])
+            self._add_cells(obj, *cr)
+        self._items[obj] = (left, top, right, bottom) + cr
+
+    update = move
+
+    def rect_of(self, obj):
+        """
+        Return the (left, top, right, bottom) bounds stored for an object
+        :param obj: object
+        :return: tuple|None if the object is not indexed
+        """
+        item = self._items.get(obj)
+        return None if item is None else item[:4]
+
+    def _candidates(self, left, top, right, bottom):
+        cells = self._cells
+        cx0, cy0, cx1, cy1 = self._cell_range(left, top, right, bottom)
+        found = set()
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def query_rect(self, rect):
+        """
+        Return every object whose rect overlaps rect
+        :param rect: pygame.Rect or anything with left, top, right and bottom
+        :return: list
+        """
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        items = self._items
+        result = []
+        for obj in self._candidates(left, top, right, bottom):
+            l, t, r, b = items[obj][:4]
+            if l < right and left < r and t < bottom and top < b:
+                result.append(obj)
+        return result
+
+    def query_point(self, x, y):
+        """
+        Return every object whose rect contains the point
+        :param x: number
+        :param y: number
+        :return: list
+        """
+        bucket = self._cells.get((int(x // self._cell_size), int(y // self._cell_size)))
+        if not bucket:
+            return []
+        items = self._items
+        result = []
+        for obj in bucket:
+            l, t, r, b = items[obj][:4]
+            if l <= x < r and t <= y < b:
+                result.append(obj)
+        return result
+
+    def query_radius(self, x, y, radius):
+        """
+        Return every object whose rect intersects the circle around (x, y)
+        :param x: number
+        :param y: number
+        :param radius: number
+        :return: list
+        """
+        items = self._items
+        r2 = radius * radius
+        result = []
+        for obj in self._candidates(x - radius, y - radius, x + radius + 1, y + radius + 1):
+            l, t, r, b = items[obj][:4]
+            dx = x - min(max(x, l), r)
+            dy = y - min(max(y, t), b)
+            if dx * dx + dy * dy <= r2:
+                result.append(obj)
+        return result
+
+    def pairs(self):
+        """
+        Yield every pair of indexed objects whose rects overlap, each pair once.  A pair is only reported by the cell
+        holding the top left corner of the area the two objects share, so no seen-set is needed.
+        :return: generator of (object, object)
+        """
+        items = self._items
+        for (cx, cy), bucket in self._cells.items():
+            if len(bucket) < 2:
+                continue
+            objs = list(bucket)
+            for i in range(0, len(objs) - 1):
+                a = objs[i]
+                al, at, ar, ab, acx, acy = items[a][:6]
+                for j in range(i + 1, len(objs)):
+                    b = objs[j]
+                    bl, bt, br, bb, bcx, bcy = items[b][:6]
+                    if (acx if acx > bcx else bcx) != cx or (acy if acy > bcy else bcy) != cy:
+                        continue
+                    if al < br and bl < ar and at < bb and bt < ab:
+                        yield a, b
+
+    def __contains__(self, obj):
+        return obj in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        """
+        Remove every object
+        :return: None
+        """
+        self._cells.clear()
+        self._items.clear()
+
+    def count(self):
+        """
+        Return the number of indexed objects
+        :return: int
+        """
+        return len(self._items)
+
+
+class EntityTable(object):
+    """
+    Struct-of-arrays entity storage
+
+    Each component is a typed column (array module typecodes, e.g. {'x': 'f', 'y': 'f', 'vx': 'f', 'vy': 'f'}) and
+    each entity is one row.  Entity ids never change or get reused, rows do: destroy() moves the last row into the
+    hole (swap-remove) so columns stay dense.  With NumPy the columns are arrays with spare capacity that doubles as
+    needed and batch operations such as integrate() and cull() run as whole-column operations; without NumPy the
+    columns are array.array objects and the batch operations loop in Python.
+    """
+
+    def __init__(self, columns, capacity=64, use_numpy=None):
+        use_numpy = resolve_use_numpy("EntityTable", use_numpy)
+        self.use_numpy = use_numpy
+        self._types = dict(columns)
+        self._size = 0
+        self._next_id = 0
+        self._id_to_row = {}
+        if use_numpy:
+            self._capacity = max(capacity, 1)
+            self._columns = {name: numpy.zeros(self._capacity, dtype=numpy.dtype(t)) for name, t in columns.items()}
+            self._row_ids = numpy.zeros(self._capacity, dtype=numpy.int64)
+        else:
+            self._columns = {name: array(t) for name, t in columns.items()}
+            self._row_ids = array('q')
+
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+        capacity = max(self._capacity * 2, size)
+        for name, col in self._columns.items():
+            grown = numpy.zeros(capacity, dtype=col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._columns[name] = grown
+        grown = numpy.zeros(capacity, dtype=numpy.int64)
+        grown[:self._size] = self._row_ids[:self._size]
+        self._row_ids = grown
+        self._capacity = capacity
+
+    def _stage(self, count, values):
+        """
+        Convert and check every value before any column is touched, so a bad value leaves the table unchanged
+        :param count: int number of rows being added
+        :param values: column name to value or sequence of count values
+        :return: dict of column name to staged values
+        """
+        for name in values:
+            if name not in self._columns:
+                raise KeyError("EntityTable has no column {}".format(name))
+        staged = {}
+        for name, col in self._columns.items():
+            v = values.get(name, 0)
+            if self.use_numpy:
+                converted = numpy.asarray(v)
+                if converted.ndim != 0 and converted.shape != (count,):
+                    raise ValueError("EntityTable column {} expects {} values not {}".format(name, count,
+                                                                                         converted.shape))
+                if not numpy.can_cast(converted.dtype, col.dtype, casting='same_kind'):
+                    raise TypeError("EntityTable column {} of type {} cannot hold {} values".format(
+                        name, col.dtype, converted.dtype))
+            else:
+                if isinstance(v, (int, float)):
+                    converted = array(col.typecode, [v]) * count
+                else:
+                    converted = array(col.typecode, v)
+                    if len(converted) != count:
+                        raise ValueError("EntityTable column {} expects {} values not {}".format(name, count,
+                                                                                             len(converted)))
+            staged[name] = converted
+        return staged
+
+    def create(self, **values):
+        """
+        Add an entity, columns that are not given start at 0
+        :param values: column name to value
+        :return: int entity id
+        """
+        staged = self._stage(1, values)
+        eid = self._next_id
+        self._next_id += 1
+        row = self._size
+        if self.use_numpy:
+            self._reserve(row + 1)
+            for name, col in self._columns.items():
+                col[row] = staged[name]
+            self._row_ids[row] = eid
+        else:
+            for name, col in self._columns.items():
+                col.extend(staged[name])
+            self._row_ids.append(eid)
+        self._id_to_row[eid] = row
+        self._size += 1
+        return eid
+
+    def create_many(self, count, **values):
+        """
+        Add count entities at once.  Each value is either one value for every entity or a sequence of count values.
+        :param count: int
+        :param values: column name to value or sequence
+        :return: list of int entity ids
+        """
+        staged = self._stage(count, values)
+        start = self._size
+        first_id = self._next_id
+        ids = list(range(first_id, first_id + count))
+        if self.use_numpy:
+            self._reserve(start + count)
+            for name, col in self._columns.items():
+                col[start:start + count] = staged[name]
+            self._row_ids[start:start + count] = ids
+        else:
+            for name, col in self._columns.items():
+                col.extend(staged[name])
+            self._row_ids.extend(ids)
+        self._id_to_row.update(zip(ids, range(start, start + count)))
+        self._next_id += count
+        self._size += count
+        return ids
+
+    def destroy(self, eid):
+        """
+        Remove an entity, the last row is moved into its place
+        :param eid: int entity id
+        :return: None
+        """
+        row = self._id_to_row.pop(eid)
+        last = self._size - 1
+        if row != last:
+            for col in self._columns.values():
+                col[row] = col[last]
+            moved = self._row_ids[last]
+            self._row_ids[row] = moved
+            self._id_to_row[int(moved)] = row
+        if not self.use_numpy:
+            for col in self._columns.values():
+                col.pop()
+            self._row_ids.pop()
+        self._size = last
+
+    def remove_where(self, mask):
+        """
+        Remove every entity whose row is true in mask, compacting the columns in one pass
+        :param mask: sequence of bool, one per row
+        :return: list of int removed entity ids
+        """
+        n = self._size
+        if self.use_numpy:
+            mask = numpy.asarray(mask, dtype=bool)[:n]
+            if not mask.any():
+                return []
+            keep = ~mask
+            removed = self._row_ids[:n][mask].tolist()
+            first = int(numpy.argmax(mask))
+            k = int(keep.sum())
+            for col in self._columns.values():
+                col[:k] = col[:n][keep]
+            self._row_ids[:k] = self._row_ids[:n][keep]
+            row_ids = self._row_ids[first:k].tolist()
+        else:
+            keep = [not m for m in mask]
+            if all(keep):
+                return []
+            removed = [eid for eid, m in zip(self._row_ids, mask) if m]
+            first = keep.index(False)
+            for name, col in self._columns.items():
+                self._columns[name] = array(col.typecode, [v for v, k in zip(col, keep) if k])
+            self._row_ids = array('q', [eid for eid, k in zip(self._row_ids, keep) if k])
+            k = len(self._row_ids)
+            row_ids = self._row_ids[first:k].tolist()
+        for eid in removed:
+            del self._id_to_row[eid]
+        for row, eid in enumerate(row_ids, first):
+            self._id_to_row[eid] = row
+        self._size = k
+        return removed
+
+    def column(self, name):
+        """
+        Return the live rows of a column, a NumPy view or the array.array itself, row order matches ids()
+        :param name: column name
+        :return: numpy.ndarray|array.array
+        """
+        if self.use_numpy:
+            return self._columns[name][:self._size]
+        return self._columns[name]
+
+    def ids(self):
+        """
+        Return the entity id of every row
+        :return: list of int
+        """
+        return self._row_ids[:self._size].tolist()
+
+    def row_of(self, eid):
+        """
+        Return the current row of an entity, rows change when other entities are destroyed
+        :param eid: int entity id
+        :return: int
+        """
+        return self._id_to_row[eid]
+
+    def get(self, eid, name):
+        """
+        Return one component of an entity
+        :param eid: int entity id
+        :param name: column name
+        :return: number
+        """
+        return self._columns[name][self._id_to_row[eid]]
+
+    def set(self, eid, name, value):
+        """
+        Set one component of an entity
+        :param eid: int entity id
+        :param name: column name
+        :param value: number
+        :return: None
+        """
+        self._columns[name][self._id_to_row[eid]] = value
+
+    def integrate(self, dt, position=('x', 'y'), velocity=('vx', 'vy')):
+        """
+        Move every entity by velocity*dt, e.g. x += vx * dt for each column pair
+        :param dt: float
+        :param position: tuple of position column names
+        :param velocity: tuple of velocity column names, matching position
+        :return: None
+        """
+        n = self._size
+        for p_name, v_name in zip(position, velocity):
+            p = self._columns[p_name]
+            v = self._columns[v_name]
+            if self.use_numpy:
+                p[:n] += v[:n] * dt
+            else:
+                for i in range(0, n):
+                    p[i] += v[i] * dt
+
+    def cull(self, rect, x='x', y='y'):
+        """
+        Remove every entity whose position is outside rect
+        :param rect: pygame.Rect or anything with left, top, right and bottom
+        :param x: x column name
+        :param y: y column name
+        :return: list of int removed entity ids
+        """
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        xs = self.column(x)
+        ys = self.column(y)
+        if self.use_numpy:
+            mask = (xs < left) | (xs >= right) | (ys < top) | (ys >= bottom)
+        else:
+            mask = [not (left <= px < right and top <= py < bottom) for px, py in zip(xs, ys)]
+        return self.remove_where(mask)
+
+    def __contains__(self, eid):
+        return eid in self._id_to_row
+
+    def __len__(self):
+        return self._size
+
+    def count(self):
+        """
+        Return the number of entities
+        :return: int
+        """
+        return self._size
+
+
+class _HeapEntry(object):
+    """
+    PriorityQueue entry, doubles as the handle returned by PriorityQueue.push
+    """
+    __slots__ = ('priority', 'order', 'obj', 'index')
+
+    def __init__(self, priority, order, obj, index):
+        self.priority = priority
+        self.order = order
+        self.obj = obj
+        self.index = index
+
+
+class PriorityQueue(object):
+    """
+    Binary min-heap priority queue implemented in pure python
+
+    push and pop are O(log n).  push returns a handle that can be passed to update (decrease or increase key) and
+    remove, also O(log n).  Objects with the same priority come out in the order they were pushed.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._order = 0
+
+    def _less(self, a, b):
+        return a.priority < b.priority or (a.priority == b.priority and a.order < b.order)
+
+    def _sift_up(self, i):
+        heap = self._heap
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if not self._less(entry, p):
+                break
+            heap[i] = p
+            p.index = i
+            i = parent
+        heap[i] = entry
+        entry.index = i
+
+    def _sift_down(self, i):
+        heap = self._heap
+        size = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self._less(heap[child + 1], heap[child]):
+                child += 1
+            c = heap[child]
+            if not self._less(c, entry):
+                break
+            heap[i] = c
+            c.index = i
+            i = child
+        heap[i] = entry
+        entry.index = i
+
+    def _remove_at(self, i):
+        heap = self._heap
+        entry = heap[i]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            last.index = i
+            self._sift_down(i)
+            self._sift_up(last.index)
+        entry.index = -1
+        return entry
+
+    def push(self, obj, priority):
+        """
+        Add an object with a priority, lower priorities come out first
+        :param obj: object
+        :param priority: comparable priority
+        :return: handle for update and remove
+        """
+        entry = _HeapEntry(priority, self._order, obj, len(self._heap))
+        self._order += 1
+        self._heap.append(entry)
+        self._sift_up(entry.index)
+        return entry
+
+    def pop(self):
+        """
+        Remove and return the object with the lowest priority
+        :return: object|None if empty
+        """
+        if not self._heap:
+            return None
+        return self._remove_at(0).obj
+
+    def peek(self):
+        """
+        Return the object with the lowest priority without removing it
+        :return: object|None if empty
+        """
+        if not self._heap:
+            return None
+        return self._heap[0].obj
+
+    def peek_priority(self):
+        """
+        Return the lowest priority in the queue
+        :return: priority|None if empty
+        """
+        if not self._heap:
+            return None
+        return self._heap[0].priority
+
+    def update(self, handle, priority):
+        """
+        Change the priority of a queued object
+        :param handle: handle returned by push
+        :param priority: new priority
+        :return: None
+        """
+        self._check_handle(handle)
+        old = handle.priority
+        handle.priority = priority
+        if priority < old:
+            self._sift_up(handle.index)
+        else:
+            self._sift_down(handle.index)
+
+    def remove(self, handle):
+        """
+        Remove a queued object by its handle
+        :param handle: handle returned by push
+        :return: object
+        """
+        self._check_handle(handle)
+        return self._remove_at(handle.index).obj
+
+    def contains(self, handle):
+        """
+        Check if a handle is still queued
+        :param handle: handle returned by push
+        :return: bool
+        """
+        return 0 <= handle.index < len(self._heap) and self._heap[handle.index] is handle
+
+    def _check_handle(self, handle):
+        if not self.contains(handle):
+            raise ValueError("Handle is not queued in this PriorityQueue")
+
+    def clear(self):
+        """
+        Clear the queue
+        :return: None
+        """
+        for entry in self._heap:
+            entry.index = -1
+        self._heap.clear()
+
+    def count(self):
+        """
+        Return the number of objects in the queue
+        :return: int
+        """
+        return len(self._heap)
+
+
+class _Timer(object):
+    """
+    TimerWheel entry, doubles as the handle returned by TimerWheel.schedule
+    """
+    __slots__ = ('tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, tick, callback, args):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel(object):
+    """
+    Hierarchical timer wheel for "fire at tick T" callbacks
+
+    Level 0 has one bucket per tick, every level above covers slots times the span of the level below.  Scheduling
+    and cancelling are O(1); each tick only touches the timers that fire, plus the occasional cascade of a higher
+    level bucket into the levels below.  Timers further out than slots**levels ticks stay in the top level and are
+    re-filed each time their bucket comes around.
+    """
+
+    def __init__(self, slots=256, levels=4):
+        if slots < 2 or levels < 1:
+            raise ValueError("TimerWheel needs at least 2 slots and 1 level")
+        self.now = 0
+        self._slots = slots
+        self._levels = levels
+        self._spans = [slots ** level for level in range(0, levels)]
+        self._wheels = [[[] for _ in range(0, slots)] for _ in range(0, levels)]
+        self._count = 0
+
+    def _file(self, timer):
+        delta = timer.tick - self.now
+        slots = self._slots
+        for level in range(0, self._levels - 1):
+            if delta < self._spans[level] * slots:
+                self._wheels[level][(timer.tick // self._spans[level]) % slots].append(timer)
+                return
+        top = self._levels - 1
+        self._wheels[top][(timer.tick // self._spans[top]) % slots].append(timer)
+
+    def schedule(self, tick, callback, *args):
+        """
+        Call callback(*args) when the wheel reaches tick.  Ticks that have already passed fire on the next tick.
+        :param tick: int absolute tick
+        :param callback: callable
+        :return: handle for cancel
+        """
+        timer = _Timer(max(tick, self.now + 1), callback, args)
+        self._file(timer)
+        self._count += 1
+        return timer
+
+    def schedule_in(self, delay, callback, *args):
+        """
+        Call callback(*args) delay ticks from now
+        :param delay: int
+        :param callback: callable
+        :return: handle for cancel
+        """
+        return self.schedule(self.now + delay, callback, *args)
+
+    def cancel(self, handle):
+        """
+        Cancel a scheduled timer, does nothing if it already fired or was cancelled
+        :param handle: handle returned by schedule
+        :return: None
+        """
+        if not handle.cancelled:
+            handle.cancelled = True
+            self._count -= 1
+
+    def advance(self, ticks=1):
+        """
+        Move the wheel forward, firing every timer that comes due
+        :param ticks: int
+        :return: int number of callbacks fired
+        """
+        fired = 0
+        slots = self._slots
+        for _ in range(0, ticks):
+            self.now += 1
+            now = self.now
+            for level in range(self._levels - 1, 0, -1):
+                span = self._spans[level]
+                if now % span == 0:
+                    wheel = self._wheels[level]
+                    index = (now // span) % slots
+                    bucket = wheel[index]
+                    if bucket:
+                        wheel[index] = []
+                        for timer in bucket:
+                            if not timer.cancelled:
+                                self._file(timer)
+            wheel = self._wheels[0]
+            index = now % slots
+            bucket = wheel[index]
+            if not bucket:
+                continue
+            wheel[index] = []
+            for timer in bucket:
+                if timer.cancelled:
+                    continue
+                if timer.tick > now:
+                    # a single level wheel keeps far timers in level 0 until their tick comes around
+                    self._file(timer)
+                    continue
+                # mark fired so a late cancel does not change the count
+                timer.cancelled = True
+                self._count -= 1
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+    def count(self):
+        """
+        Return the number of timers waiting to fire
+        :return: int
+        """
+        return self._count
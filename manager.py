@@ -3,44 +3,498 @@ Managers are generic dictionary wrappers.  You can use a dictionary to the same
 managers do not provide iteration functionality nor do they provide direct access to the underlying dictionary.
 
 These are more for organizational purposes than functional purposes.
+
+Managers are unbounded by default.  Give one an eviction policy (LRUPolicy, LFUPolicy or TTLPolicy) together with
+max_entries and/or max_bytes to have it drop entries on its own.  Byte budgets use a weigher function to estimate the
+size of each object, pinned keys are never evicted.
 """
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from os import path
+import pygame
+import rgbcolor
+from resource import load_image, load_font
+
+# estimated weight of a font, pygame does not expose the memory used by a Font
+FONT_WEIGHT = 64 * 1024
+
+
+def surface_weight(surface):
+    """
+    Estimated memory used by a surface: width*height*bytesize.  Objects that are not surfaces weigh nothing.
+    :param surface: pygame.Surface
+    :return: int
+    """
+    try:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+    except AttributeError:
+        return 0
+
+
+def font_weight(font):
+    """
+    Fixed weight for fonts
+    :param font: pygame.font.Font
+    :return: int
+    """
+    return FONT_WEIGHT
+
+
+class LRUPolicy(object):
+    """
+    Least recently used entries are evicted first
+    """
+
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def added(self, key):
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def accessed(self, key):
+        self._order.move_to_end(key)
+
+    def removed(self, key):
+        self._order.pop(key, None)
+
+    def expired(self, key):
+        return False
+
+    def expired_keys(self):
+        return []
+
+    def victim(self, pinned, skip=None):
+        """
+        Return the key that should be evicted next
+        :param pinned: set of keys that must not be evicted
+        :param skip: key that must not be evicted, the entry that was just added
+        :return: key|None if every key is pinned
+        """
+        for key in self._order:
+            if key not in pinned and key != skip:
+                return key
+        return None
+
+    def clear(self):
+        self._order.clear()
+
+
+class LFUPolicy(object):
+    """
+    Least frequently used entries are evicted first, ties go to the least recently used
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._buckets = {}
+
+    def _move(self, key, count):
+        old = self._counts.get(key)
+        if old is not None:
+            bucket = self._buckets[old]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old]
+        self._counts[key] = count
+        self._buckets.setdefault(count, OrderedDict())[key] = None
+
+    def added(self, key):
+        self._move(key, 1)
+
+    def accessed(self, key):
+        self._move(key, self._counts[key] + 1)
+
+    def removed(self, key):
+        count = self._counts.pop(key, None)
+        if count is not None:
+            bucket = self._buckets[count]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[count]
+
+    def expired(self, key):
+        return False
+
+    def expired_keys(self):
+        return []
+
+    def victim(self, pinned, skip=None):
+        for count in sorted(self._buckets):
+            for key in self._buckets[count]:
+                if key not in pinned and key != skip:
+                    return key
+        return None
+
+    def clear(self):
+        self._counts.clear()
+        self._buckets.clear()
+
+
+class TTLPolicy(object):
+    """
+    Entries expire ttl seconds after they were added (or last used with refresh_on_get), oldest entries are evicted
+    first when the manager is over budget
+    """
+
+    def __init__(self, ttl, refresh_on_get=False, clock=time.monotonic):
+        self.ttl = ttl
+        self.refresh_on_get = refresh_on_get
+        self._clock = clock
+        self._stamps = OrderedDict()
+
+    def added(self, key):
+        self._stamps[key] = self._clock()
+        self._stamps.move_to_end(key)
+
+    def accessed(self, key):
+        if self.refresh_on_get:
+            self.added(key)
+
+    def removed(self, key):
+        self._stamps.pop(key, None)
+
+    def expired(self, key):
+        stamp = self._stamps.get(key)
+        return stamp is not None and self._clock() - stamp > self.ttl
+
+    def expired_keys(self):
+        # stamps are kept in time order, so expired keys are all at the front
+        keys = []
+        now = self._clock()
+        for key, stamp in self._stamps.items():
+            if now - stamp <= self.ttl:
+                break
+            keys.append(key)
+        return keys
+
+    def victim(self, pinned, skip=None):
+        for key in self._stamps:
+            if key not in pinned and key != skip:
+                return key
+        return None
+
+    def clear(self):
+        self._stamps.clear()
+
+
+class CacheStats(object):
+    """
+    Counters kept by a CachedManager with stats enabled, see CachedManager.enable_stats
+    """
+
+    # upper bounds in seconds of the load time histogram buckets, the last bucket holds everything slower
+    LOAD_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.load_histogram = [0 for _ in range(0, len(self.LOAD_BUCKETS) + 1)]
+
+    def record_load(self, seconds):
+        self.loads += 1
+        self.load_seconds += seconds
+        self.load_histogram[bisect.bisect_left(self.LOAD_BUCKETS, seconds)] += 1
 
 
 class CachedManager(object):
     """
     Generic Dict wrapper.  This just provides some managed methods for accessing a dict without giving direct
     access to the dict
+
+    :param policy: eviction policy instance, None keeps every entry unless a limit is set, then LRU is used
+    :param max_entries: maximum number of entries, 0 is unlimited
+    :param max_bytes: maximum total weight of the entries, 0 is unlimited
+    :param weigher: function returning the estimated size of an object in bytes
     """
 
-    def __init__(self):
+    def __init__(self, policy=None, max_entries=0, max_bytes=0, weigher=None):
+        if policy is None and (max_entries != 0 or max_bytes != 0):
+            policy = LRUPolicy()
         self._cache = {}
+        self._policy = policy
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._weigher = weigher
+        self._weights = {}
+        self._total_bytes = 0
+        self._pinned = set()
+        self._load_lock = threading.Lock()
+        self._loading = {}
+        # load_id -> key and key -> load_id for entries created by _get_or_load, pruned whenever the key goes away
+        self._loaded_from = {}
+        self._load_ids = {}
+        self._stats = None
+
+    def enable_stats(self, callback=None, interval=0.0):
+        """
+        Start counting hits, misses, inserts, evictions and load times.  Counting swaps in instrumented get and add
+        methods on this instance, so managers without stats pay nothing.
+        :param callback: called with stats() every interval seconds, defaults to logging at INFO level
+        :param interval: float seconds between callbacks, 0 disables the periodic hook
+        :return: None
+        """
+        self._stats = CacheStats()
+        self._stats_callback = callback
+        self._stats_interval = interval
+        self._stats_next = time.monotonic() + interval
+        self.get = self._get_counted
+        self.add = self._add_counted
+
+    def disable_stats(self):
+        """
+        Stop counting and drop the counters
+        :return: None
+        """
+        self._stats = None
+        self.__dict__.pop('get', None)
+        self.__dict__.pop('add', None)
+
+    def stats(self):
+        """
+        Return a snapshot of the counters
+        :return: dict|None if stats are not enabled
+        """
+        st = self._stats
+        if st is None:
+            return None
+        if self._policy is not None or self._weigher is None:
+            resident = self._total_bytes
+        else:
+            resident = sum(self._weigher(obj) for obj in self._cache.values())
+        lookups = st.hits + st.misses
+        return {
+            'manager': self.__class__.__name__,
+            'entries': len(self._cache),
+            'resident_bytes': resident,
+            'hits': st.hits,
+            'misses': st.misses,
+            'hit_ratio': st.hits / float(lookups) if lookups else 0.0,
+            'inserts': st.inserts,
+            'evictions': st.evictions,
+            'loads': st.loads,
+            'load_seconds': st.load_seconds,
+            'load_histogram': dict(zip([str(b) for b in CacheStats.LOAD_BUCKETS] + ['slower'], st.load_histogram)),
+        }
+
+    def _stats_tick(self):
+        if self._stats_interval and time.monotonic() >= self._stats_next:
+            self._stats_next = time.monotonic() + self._stats_interval
+            snapshot = self.stats()
+            if self._stats_callback is None:
+                logging.getLogger(__name__).info("%s", snapshot)
+            else:
+                self._stats_callback(snapshot)
+
+    def _get_counted(self, key):
+        obj = self.__class__.get(self, key)
+        if obj is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+        self._stats_tick()
+        return obj
+
+    def _add_counted(self, key, obj):
+        self._stats.inserts += 1
+        self.__class__.add(self, key, obj)
+        self._stats_tick()
+
+    def _get_or_load(self, key, load_id, loader, *args):
+        """
+        Return the cached object for key, or load it with loader(*args) and cache it.  load_id identifies the file
+        and load options, a key whose load_id was already loaded under another key reuses that object, and threads
+        asking for the same load_id at the same time wait for a single load.
+        :param key: cache key, None uses load_id
+        :param load_id: hashable description of what is loaded
+        :param loader: callable
+        :return: object
+        """
+        if key is None:
+            key = load_id
+        with self._load_lock:
+            obj = self.get(key)
+            if obj is not None:
+                return obj
+            other = self._loaded_from.get(load_id)
+            if other is not None:
+                obj = self.get(other)
+                if obj is not None:
+                    self.add(key, obj)
+                    return obj
+            future = self._loading.get(load_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[load_id] = future
+        if not owner:
+            return future.result()
+        start = time.perf_counter()
+        try:
+            obj = loader(*args)
+            if self._stats is not None:
+                self._stats.record_load(time.perf_counter() - start)
+        except BaseException as e:
+            with self._load_lock:
+                del self._loading[load_id]
+            future.set_exception(e)
+            raise
+        with self._load_lock:
+            del self._loading[load_id]
+            self.add(key, obj)
+            if key in self._cache:
+                self._loaded_from[load_id] = key
+                self._load_ids[key] = load_id
+        future.set_result(obj)
+        return obj
 
     def add(self, key, obj):
+        self._forget_load(key)
+        if self._policy is None:
+            self._cache[key] = obj
+            return
+        if key in self._cache:
+            self.remove(key)
         self._cache[key] = obj
+        if self._weigher is not None:
+            weight = self._weigher(obj)
+            self._weights[key] = weight
+            self._total_bytes += weight
+        self._policy.added(key)
+        self._evict(key)
 
     def get(self, key):
-        return self._cache.get(key)
+        if self._policy is None:
+            return self._cache.get(key)
+        if key not in self._cache:
+            return None
+        if self._policy.expired(key) and key not in self._pinned:
+            self._evict_key(key)
+            return None
+        self._policy.accessed(key)
+        return self._cache[key]
 
     def has(self, key):
+        if self._policy is not None and key in self._cache and self._policy.expired(key) and \
+                key not in self._pinned:
+            self._evict_key(key)
         return key in self._cache.keys()
 
+    def remove(self, key):
+        """
+        Remove an entry, does nothing if the key is not cached
+        :param key: object
+        :return: None
+        """
+        if key not in self._cache:
+            return
+        del self._cache[key]
+        self._forget_load(key)
+        self._total_bytes -= self._weights.pop(key, 0)
+        if self._policy is not None:
+            self._policy.removed(key)
+
+    def pin(self, key):
+        """
+        Never evict key, pins are kept by key and survive clear()
+        :param key: object
+        :return: None
+        """
+        self._pinned.add(key)
+
+    def unpin(self, key):
+        """
+        Allow key to be evicted again, evicting right away if the manager is over budget
+        :param key: object
+        :return: None
+        """
+        self._pinned.discard(key)
+        if self._policy is not None:
+            self._evict()
+
+    def size_bytes(self):
+        """
+        Return the total estimated weight of the cached entries, only tracked when the manager has a policy
+        :return: int
+        """
+        return self._total_bytes
+
+    def keys(self):
+        """
+        Return the cached keys without counting as an access
+        :return: list
+        """
+        return list(self._cache.keys())
+
+    def _over_budget(self):
+        return (self._max_entries != 0 and len(self._cache) > self._max_entries) or \
+               (self._max_bytes != 0 and self._total_bytes > self._max_bytes)
+
+    def _evict(self, added=None):
+        policy = self._policy
+        for key in policy.expired_keys():
+            if key not in self._pinned:
+                self._evict_key(key)
+        while self._over_budget():
+            key = policy.victim(self._pinned, added)
+            if key is None:
+                break
+            self._evict_key(key)
+
+    def _forget_load(self, key):
+        load_id = self._load_ids.pop(key, None)
+        if load_id is not None:
+            del self._loaded_from[load_id]
+
+    def _evict_key(self, key):
+        self.remove(key)
+        if self._stats is not None:
+            self._stats.evictions += 1
+
     def clear(self):
         self._cache.clear()
+        self._loaded_from.clear()
+        self._load_ids.clear()
+        self._weights.clear()
+        self._total_bytes = 0
+        if self._policy is not None:
+            self._policy.clear()
 
 
 class ImageManager(CachedManager):
     """
-    Generic CachedManager with Image specific naming
+    Generic CachedManager with Image specific naming, byte budgets weigh surfaces as width*height*bytesize
     """
 
+    def __init__(self, policy=None, max_entries=0, max_bytes=0, weigher=surface_weight):
+        super().__init__(policy, max_entries, max_bytes, weigher)
+
     def add_image(self, image_key, image_surface):
-        super().add(image_key, image_surface)
+        self.add(image_key, image_surface)
+
+    def get_or_load(self, image_key, image_dir, image_name, color_key=None, use_alpha=False):
+        """
+        Return the cached image, loading it with resource.load_image on a miss
+        :param image_key: cache key, None uses (path, color_key, use_alpha)
+        :return: pygame.Surface
+        """
+        load_id = (path.normpath(path.join(image_dir, image_name)),
+                   None if color_key is None else tuple(color_key), use_alpha)
+        return self._get_or_load(image_key, load_id, load_image, image_dir, image_name, color_key, use_alpha)
 
     def get_image(self, image_key):
-        return super().get(image_key)
+        return self.get(image_key)
 
     def has_image(self, image_key):
-        return super().has(image_key)
+        return self.has(image_key)
 
     def clear_cache(self):
         super().clear()
@@ -48,17 +502,113 @@ class ImageManager(CachedManager):
 
 class FontManager(CachedManager):
     """
-    Generic CachedManager with Font specific naming
+    Generic CachedManager with Font specific naming, byte budgets weigh every font as FONT_WEIGHT
     """
 
+    def __init__(self, policy=None, max_entries=0, max_bytes=0, weigher=font_weight):
+        super().__init__(policy, max_entries, max_bytes, weigher)
+
     def add_font(self, font_key, font_obj):
-        super().add(font_key, font_obj)
+        self.add(font_key, font_obj)
+
+    def get_or_load(self, font_key, font_dir, font_name, font_size):
+        """
+        Return the cached font, loading it with resource.load_font on a miss
+        :param font_key: cache key, None uses (path, size)
+        :return: pygame.font.Font
+        """
+        file, ext = path.splitext(font_name)
+        load_id = (path.normpath(path.join(font_dir, font_name if ext != '' else "{}.ttf".format(font_name))),
+                   font_size)
+        return self._get_or_load(font_key, load_id, load_font, font_dir, font_name, font_size)
 
     def get_font(self, font_key):
-        return super().get(font_key)
+        return self.get(font_key)
 
     def has_font(self, font_key):
-        return super().has(font_key)
+        return self.has(font_key)
 
     def clear_cache(self):
         super().clear()
+
+
+class VariantCache(object):
+    """
+    Cache of scaled, rotated, flipped and tinted variants of the images in an ImageManager
+
+    Each variant is generated once and kept in its own LRU CachedManager with a byte budget separate from the base
+    images.  Angles are quantized to angle_steps steps per turn so a spinning sprite reuses a fixed set of frames.
+    Tints multiply the image colours and can be rgbcolor names such as 'RED' or anything pygame.Color accepts.
+    """
+
+    def __init__(self, image_manager, max_bytes=32*1024*1024, angle_steps=64):
+        self.image_manager = image_manager
+        self.angle_steps = angle_steps
+        self._variants = CachedManager(LRUPolicy(), max_bytes=max_bytes, weigher=surface_weight)
+
+    def _quantize(self, angle):
+        step = 360.0 / self.angle_steps
+        return (int(round((angle % 360.0) / step)) % self.angle_steps) * step
+
+    @staticmethod
+    def _tint_color(tint):
+        if tint is None:
+            return None
+        return tuple(rgbcolor.resolve(tint))
+
+    def get(self, base_key, scale=1.0, angle=0.0, flip_x=False, flip_y=False, tint=None):
+        """
+        Return a transformed variant of an image, generating it on first use
+        :param base_key: key of the image in the ImageManager
+        :param scale: float
+        :param angle: float degrees counter clockwise, quantized to angle_steps
+        :param flip_x: bool
+        :param flip_y: bool
+        :param tint: rgbcolor name or colour multiplied into the image, None for no tint
+        :return: pygame.Surface|None if the base image is not in the ImageManager
+        """
+        angle = self._quantize(angle)
+        color = self._tint_color(tint)
+        key = (base_key, scale, angle, flip_x, flip_y, color)
+        surface = self._variants.get(key)
+        if surface is not None:
+            return surface
+        base = self.image_manager.get_image(base_key)
+        if base is None:
+            return None
+        surface = base
+        if flip_x or flip_y:
+            surface = pygame.transform.flip(surface, flip_x, flip_y)
+        if angle != 0.0 or scale != 1.0:
+            surface = pygame.transform.rotozoom(surface, angle, scale)
+        if color is not None:
+            if surface is base:
+                surface = base.copy()
+            surface.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+        self._variants.add(key, surface)
+        return surface
+
+    def invalidate(self, base_key):
+        """
+        Drop every variant of an image, e.g. after the base image was replaced
+        :param base_key: key of the image in the ImageManager
+        :return: None
+        """
+        # built from the live keys, evicted variants need no bookkeeping
+        for key in self._variants.keys():
+            if key[0] == base_key:
+                self._variants.remove(key)
+
+    def size_bytes(self):
+        """
+        Return the estimated memory used by the cached variants
+        :return: int
+        """
+        return self._variants.size_bytes()
+
+    def clear(self):
+        """
+        Drop every variant
+        :return: None
+        """
+        self._variants.clear()
@@ -0,0 +1,188 @@
+"""
+On-disk cache for generated noise maps.
+
+Each map is stored in its own file named after a hash of (width, height, seed, generator settings, algorithm
+version), with a small header followed by the raw uint8 cells.  Loads are memory-mapped so a cached map costs a file
+open instead of a regeneration.  Files are written to a temporary file and renamed into place, and the least
+recently used files are removed once the directory grows past max_bytes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from perlin2d import Perlin2D, ALGORITHM_VERSION
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, maps are returned as read-only memoryviews without it
+    numpy = None
+
+_MAGIC = b'PGLN'
+_HEADER = struct.Struct('<4sHxxII')
+_SUFFIX = '.noise'
+
+
+class NoiseCache(object):
+    """
+    Directory of memory-mapped noise maps.  Loaded maps are numpy.memmap objects when NumPy is installed, otherwise
+    read-only memoryviews of an mmap.mmap; both index like the generated maps, cell (x, y) at [y*width+x].
+    """
+
+    def __init__(self, cache_dir, max_bytes=256*1024*1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, width, height, seed, **params):
+        """
+        Build the cache key for a map
+        :param width: int
+        :param height: int
+        :param seed: int
+        :param params: generator settings, e.g. octaves, lacunarity
+        :return: str
+        """
+        parts = [('algorithm', ALGORITHM_VERSION), ('width', width), ('height', height), ('seed', seed)]
+        parts.extend(sorted(params.items()))
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + _SUFFIX)
+
+    def load(self, width, height, seed, **params):
+        """
+        Map a cached noise map into memory
+        :return: numpy.memmap|memoryview|None if the map is not cached
+        """
+        full_path = self._path(self.key(width, height, seed, **params))
+        try:
+            with open(full_path, 'rb') as handle:
+                header = handle.read(_HEADER.size)
+                size = os.fstat(handle.fileno()).st_size
+                valid = (len(header) == _HEADER.size and size == _HEADER.size + width * height and
+                         _HEADER.unpack(header) == (_MAGIC, ALGORITHM_VERSION, width, height))
+                if not valid:
+                    data = None
+                elif numpy is not None:
+                    data = numpy.memmap(handle, dtype=numpy.uint8, mode='r', offset=_HEADER.size,
+                                        shape=(width * height,))
+                else:
+                    data = memoryview(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))[_HEADER.size:]
+        except FileNotFoundError:
+            return None
+        if data is None:
+            self._remove(full_path)
+            return None
+        # the modification time doubles as the last use time for eviction
+        os.utime(full_path)
+        return data
+
+    def store(self, noise_map, width, height, seed, **params):
+        """
+        Atomically write a noise map to the cache, then evict old maps if the cache is over max_bytes
+        :param noise_map: bytearray|bytes|numpy.ndarray of width*height uint8 values
+        :return: str path of the cache file
+        """
+        view = memoryview(noise_map)
+        if view.itemsize != 1:
+            raise ValueError("NoiseCache.store expects uint8 values not {}".format(view.format))
+        if view.nbytes != width * height:
+            raise ValueError("NoiseCache.store expects {} values not {}".format(width * height, view.nbytes))
+        full_path = self._path(self.key(width, height, seed, **params))
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(_HEADER.pack(_MAGIC, ALGORITHM_VERSION, width, height))
+                handle.write(view.cast('B'))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict(keep=full_path)
+        return full_path
+
+    def get_or_create(self, width, height, seed, generate, **params):
+        """
+        Load a map from the cache, or call generate() and cache its result on a miss
+        :param generate: callable returning width*height uint8 values
+        :return: numpy.memmap|memoryview
+        """
+        data = self.load(width, height, seed, **params)
+        if data is None:
+            self.store(generate(), width, height, seed, **params)
+            data = self.load(width, height, seed, **params)
+        return data
+
+    def perlin2d(self, width, height, seed):
+        """
+        Cached Perlin2D noise map
+        :param seed: int, required because an unseeded map cannot be looked up again
+        :return: numpy.memmap|memoryview
+        """
+        if seed is None:
+            raise ValueError("NoiseCache.perlin2d needs a seed, unseeded maps are random and cannot be cached")
+        return self.get_or_create(width, height, seed, lambda: Perlin2D(width, height, seed=seed).noise_map,
+                                  kind='perlin2d')
+
+    def fractal(self, fractal_noise, width, height, x_offset=0, y_offset=0, workers=1):
+        """
+        Cached FractalNoise map
+        :param fractal_noise: FractalNoise
+        :return: numpy.memmap|memoryview
+        """
+        return self.get_or_create(width, height, fractal_noise.seed,
+                                  lambda: fractal_noise.generate(width, height, x_offset, y_offset, workers),
+                                  kind='fractal', octaves=fractal_noise.octaves, frequency=fractal_noise.frequency,
+                                  lacunarity=fractal_noise.lacunarity, persistence=fractal_noise.persistence,
+                                  x_offset=x_offset, y_offset=y_offset)
+
+    def size(self):
+        """
+        Return the number of bytes used by cached maps
+        :return: int
+        """
+        return sum(s for _, _, s in self._entries())
+
+    def clear(self):
+        """
+        Remove every cached map
+        :return: None
+        """
+        for full_path, _, _ in self._entries():
+            self._remove(full_path)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            full_path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            entries.append((full_path, st.st_mtime, st.st_size))
+        return entries
+
+    def _evict(self, keep=None):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(s for _, _, s in entries)
+        for full_path, _, s in entries:
+            if total <= self.max_bytes:
+                break
+            if full_path == keep:
+                continue
+            if self._remove(full_path):
+                total -= s
+
+    @staticmethod
+    def _remove(full_path):
+        try:
+            os.remove(full_path)
+            return True
+        except OSError:
+            # missing, or still mapped on platforms that refuse to delete open files
+            return False
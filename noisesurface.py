@@ -0,0 +1,81 @@
+"""
+Turns 0 - 255 noise maps (Perlin2D.noise_map, PerlinChunks chunks, FractalNoise maps) into pygame Surfaces.
+
+Rendering never touches single pixels.  The noise bytes become an 8-bit palettized Surface and a 256 entry palette
+built once with build_palette maps every height to its colour, so colouring a map costs one palette upload.
+"""
+import pygame
+import rgbcolor
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, only needed for non uint8 NumPy maps
+    numpy = None
+
+
+def build_palette(stops, mode='threshold'):
+    """
+    Builds a 256 entry lookup table of colours from a list of (value, color) stops.  Colours can be rgbcolor names
+    or anything pygame.Color accepts.
+
+    threshold: every value up to and including a stop's value gets that stop's colour, values above the last stop
+    use the last colour.  e.g. [(90, 'DARK_BLUE'), (110, 'SANDY_BROWN'), (180, 'FOREST_GREEN'), (255, 'SNOW')]
+    gradient: colours are interpolated linearly between stops, values outside the stops use the nearest stop.
+    :param stops: list of (int, color) tuples
+    :param mode: 'threshold' or 'gradient'
+    :return: list of 256 (r, g, b) tuples
+    """
+    if not stops:
+        raise ValueError("build_palette needs at least one stop")
+    stops = sorted(((int(v), rgbcolor.resolve(c)) for v, c in stops), key=lambda s: s[0])
+    palette = []
+    if mode == 'threshold':
+        i = 0
+        for value in range(0, 256):
+            while i < len(stops) - 1 and value > stops[i][0]:
+                i += 1
+            c = stops[i][1]
+            palette.append((c.r, c.g, c.b))
+    elif mode == 'gradient':
+        i = 0
+        for value in range(0, 256):
+            while i < len(stops) - 1 and value > stops[i + 1][0]:
+                i += 1
+            low_v, low = stops[i]
+            if value <= low_v or i == len(stops) - 1:
+                palette.append((low.r, low.g, low.b))
+                continue
+            high_v, high = stops[i + 1]
+            t = (value - low_v) / float(high_v - low_v)
+            palette.append((int(round(low.r + (high.r - low.r) * t)),
+                            int(round(low.g + (high.g - low.g) * t)),
+                            int(round(low.b + (high.b - low.b) * t))))
+    else:
+        raise ValueError("build_palette mode must be 'threshold' or 'gradient' not {}".format(mode))
+    return palette
+
+
+def noise_to_surface(noise_map, width, height, palette):
+    """
+    Creates an 8-bit palettized Surface from a noise map in one pass.  uint8 maps (bytearray, bytes, uint8 NumPy
+    arrays) are wrapped without copying, so the Surface shares memory with noise_map; call convert() or copy() on
+    the result if the map is going to change.
+    :param noise_map: bytearray|bytes|numpy.ndarray of width*height values from 0 - 255, cell (x, y) at [y*width+x]
+    :param width: int
+    :param height: int
+    :param palette: 256 colours, usually from build_palette
+    :return: pygame.Surface
+    """
+    if len(palette) != 256:
+        raise ValueError("noise_to_surface expects a 256 entry palette not {}".format(len(palette)))
+    if numpy is not None and isinstance(noise_map, numpy.ndarray):
+        if noise_map.dtype != numpy.uint8:
+            noise_map = numpy.clip(numpy.round(noise_map), 0, 255).astype(numpy.uint8)
+        noise_map = numpy.ascontiguousarray(noise_map)
+    elif isinstance(noise_map, list):
+        noise_map = bytearray(noise_map)
+    if len(noise_map) != width * height:
+        raise ValueError("noise_to_surface expects {} values not {}".format(width * height, len(noise_map)))
+    surface = pygame.image.frombuffer(noise_map, (width, height), 'P')
+    surface.set_palette(palette)
+    return surface
@@ -0,0 +1,21 @@
+"""
+Optional dependency helpers shared by the modules that can use NumPy but do not require it.
+"""
+try:
+    import numpy
+except ImportError:  # NumPy is optional, callers fall back to pure Python paths without it
+    numpy = None
+
+
+def resolve_use_numpy(name, use_numpy):
+    """
+    Resolve a use_numpy argument: None uses NumPy when it is installed, True requires it
+    :param name: str class name used in the error message
+    :param use_numpy: bool|None
+    :return: bool
+    """
+    if use_numpy is None:
+        return numpy is not None
+    if use_numpy and numpy is None:
+        raise RuntimeError("{} was asked to use NumPy but NumPy is not installed".format(name))
+    return use_numpy
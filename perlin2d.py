@@ -1,5 +1,17 @@
 import random
 import math
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from optional import resolve_use_numpy
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, Perlin2D falls back to the pure Python path without it
+    numpy = None
+
+# bumped whenever a change alters the values produced for the same settings, caches use it to drop stale maps
+ALGORITHM_VERSION = 1
 
 
 class Perlin2D(object):
@@ -11,42 +23,134 @@ class Perlin2D(object):
 
     This particular implementation will produce an array of width*height with a variation
     from 0 - 255.  This is useful for generating height maps as well as random color patterns.
+
+    Passing the same seed always rebuilds the same map.  Gradients are stored as float32 pairs in an array.array and
+    cell (x, y) of the map is stored at noise_map[y*width+x].  When NumPy is available the map is generated with
+    whole-array operations and noise_map is a flat numpy.ndarray (uint8 by default, or float32 for the un-rounded
+    values).  Without NumPy, or with use_numpy=False, noise_map is a bytearray.  Both paths produce identical values
+    for the same seed.
     """
-    def __init__(self, width, height):
+
+    # distance between two neighbouring pixels in gradient lattice units
+    STEP_X = 0.4
+    STEP_Y = 0.4
+
+    def __init__(self, width, height, use_numpy=None, dtype='uint8', seed=None):
+        use_numpy = resolve_use_numpy("Perlin2D", use_numpy)
         self.w = width
         self.h = height
-        self.gradient_table = [(0, 0) for _ in range(0, self.w*self.h)]
+        self.seed = seed
+        self.use_numpy = use_numpy
+        # the lattice only needs to cover the sampled area, plus one extra corner in each direction
+        self.grid_w = int(math.floor((self.w - 1) * self.STEP_X)) + 2
+        self.grid_h = int(math.floor((self.h - 1) * self.STEP_Y)) + 2
+        self.gradient_table = array('f')
         self._build_gradient_table()
-        self.noise_map = [0 for _ in range(0, self.w*self.h)]
-        x0, y0 = 0.0, 0.0
-        zx = 0.4
-        zy = 0.4
-        for y in range(0, self.h):
-            for x in range(0, self.w):
-                a = int(round((128-(128*(self._noise2d(x0, y0))))))
-                self.noise_map[y*self.h+x] = a
-                x0 += zx
-            y0 += zy
-            x = 0.0
+        if self.use_numpy:
+            self.noise_map = self._generate_numpy(dtype)
+        else:
+            self.noise_map = self._generate_scalar()
+
+    def buffer(self):
+        """
+        Zero-copy view of the noise map, e.g. for pygame.image.frombuffer(p.buffer(), (w, h), 'P')
+        :return: memoryview
+        """
+        return memoryview(self.noise_map)
+
+    def as_surfarray(self):
+        """
+        Zero-copy (width, height) NumPy view of the noise map, indexed [x][y] like pygame.surfarray.  Keeps the dtype
+        the map was generated with.
+        :return: numpy.ndarray
+        """
+        if numpy is None:
+            raise RuntimeError("Perlin2D.as_surfarray requires NumPy")
+        return numpy.asarray(self.noise_map).reshape(self.h, self.w).T
+
+    def _random_vectors(self):
+        """
+        Draws the raw (un-normalized) integer gradient components, one pair per lattice point
+        :return: list of (int, int) tuples
+        """
+        random_generator = random.Random(self.seed)
+        return [(random_generator.randint(1, 2*self.w), random_generator.randint(1, 2*self.h))
+                for _ in range(0, self.grid_w*self.grid_h)]
 
     def _build_gradient_table(self):
         """
         Builds and populates the gradient table using random variations in the width/height
         :return:
         """
-        random_generator = random.Random()
-        for i in range(0, self.h):
-            for j in range(0, self.w):
-                x = float((random_generator.randint(1, 2*self.w)) - self.w) / self.h
-                y = float((random_generator.randint(1, 2*self.h)) - self.h) / self.w
-                s = math.sqrt((x * x) + (y * y))
-                if s != 0:
-                    x /= s
-                    y /= s
-                else:
-                    x = 0
-                    y = 0
-                self.gradient_table[i*self.h+j] = (x, y)
+        vectors = self._random_vectors()
+        if self.use_numpy:
+            raw = numpy.array(vectors, dtype=numpy.float64).reshape(-1, 2)
+            x = (raw[:, 0] - self.w) / self.h
+            y = (raw[:, 1] - self.h) / self.w
+            s = numpy.sqrt((x * x) + (y * y))
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                x = numpy.where(s != 0, x / s, 0.0)
+                y = numpy.where(s != 0, y / s, 0.0)
+            self.gradient_table.frombytes(numpy.stack((x, y), axis=1).astype(numpy.float32).tobytes())
+            return
+        for rx, ry in vectors:
+            x = float(rx - self.w) / self.h
+            y = float(ry - self.h) / self.w
+            s = math.sqrt((x * x) + (y * y))
+            if s != 0:
+                x /= s
+                y /= s
+            else:
+                x = 0
+                y = 0
+            self.gradient_table.append(x)
+            self.gradient_table.append(y)
+
+    def _generate_scalar(self):
+        """
+        Evaluates the noise one cell at a time in pure Python
+        :return: bytearray
+        """
+        noise_map = bytearray(self.w*self.h)
+        for y in range(0, self.h):
+            y0 = y * self.STEP_Y
+            for x in range(0, self.w):
+                a = int(round((128-(128*(self._noise2d(x * self.STEP_X, y0))))))
+                noise_map[y*self.w+x] = min(max(a, 0), 255)
+        return noise_map
+
+    def _generate_numpy(self, dtype='uint8'):
+        """
+        Evaluates the noise for every cell at once.  The arithmetic mirrors _noise2d step for step so the
+        results match the scalar path exactly.
+        :param dtype: 'uint8' for values rounded like the scalar path or 'float32' for the un-rounded values
+        :return: numpy.ndarray of width*height
+        """
+        px = (numpy.arange(self.w, dtype=numpy.float64) * self.STEP_X)[numpy.newaxis, :]
+        py = (numpy.arange(self.h, dtype=numpy.float64) * self.STEP_Y)[:, numpy.newaxis]
+        x0 = numpy.floor(px)
+        y0 = numpy.floor(py)
+        x1 = x0 + 1.0
+        y1 = y0 + 1.0
+        ix0 = x0.astype(numpy.intp)
+        iy0 = y0.astype(numpy.intp)
+        ix1 = ix0 + 1
+        iy1 = iy0 + 1
+        g = numpy.frombuffer(self.gradient_table, dtype=numpy.float32).reshape(self.grid_h, self.grid_w, 2)
+        gx = g[:, :, 0]
+        gy = g[:, :, 1]
+        s = (gx[iy0, ix0]*(px - x0)) + (gy[iy0, ix0]*(py - y0))
+        t = (gx[iy0, ix1]*(px - x1)) + (gy[iy0, ix1]*(py - y0))
+        u = (gx[iy1, ix0]*(px - x0)) + (gy[iy1, ix0]*(py - y1))
+        v = (gx[iy1, ix1]*(px - x1)) + (gy[iy1, ix1]*(py - y1))
+        sx = self._curve(px - x0)
+        a = s + sx*t - sx*s
+        b = u + sx*v - sx*u
+        sy = self._curve(py - y0)
+        values = 128-(128*(a + sy*b - sy*a))
+        if numpy.dtype(dtype) == numpy.uint8:
+            values = numpy.clip(numpy.round(values), 0, 255)
+        return values.astype(dtype).ravel()
 
     def _dot(self, v1, v2):
         """
@@ -59,7 +163,8 @@ class Perlin2D(object):
         return (v1[0]*v2[0]) + (v1[1]*v2[1])
 
     def _gradient(self, x, y):
-        return self.gradient_table[y*self.h+x]
+        i = (y*self.grid_w+x) * 2
+        return self.gradient_table[i], self.gradient_table[i+1]
 
     def _curve(self, x):
         return (3*x*x) - (2*x*x*x)
@@ -79,3 +184,318 @@ class Perlin2D(object):
         b = u + sx*v - sx*u
         sy = self._curve(y - y0)
         return a + sy*b - sy*a
+
+
+# 256 evenly spaced unit gradients used by the hash based lattice.  Built once with math so the scalar and NumPy
+# paths read the exact same values.
+_HASH_GRADIENTS = [(math.cos(2 * math.pi * i / 256), math.sin(2 * math.pi * i / 256)) for i in range(0, 256)]
+_HASH_GRADIENT_ARRAY = numpy.array(_HASH_GRADIENTS, dtype=numpy.float64) if numpy is not None else None
+
+
+def _lattice_hash(seed, ix, iy):
+    """
+    Hashes a seed and an integer lattice coordinate into a 32 bit value
+    :param seed: int
+    :param ix: int lattice x
+    :param iy: int lattice y
+    :return: int
+    """
+    h = (seed * 0x9E3779B1 + ix * 0x85EBCA77 + iy * 0xC2B2AE3D) & 0xffffffff
+    h ^= h >> 15
+    h = (h * 0x2C1B3C6D) & 0xffffffff
+    h ^= h >> 12
+    h = (h * 0x297A2D39) & 0xffffffff
+    h ^= h >> 15
+    return h
+
+
+def _lattice_hash_array(seed, ix, iy):
+    """
+    NumPy version of _lattice_hash, wraps in uint64 and masks to 32 bits so results match the scalar version
+    :param seed: int
+    :param ix: numpy.ndarray of lattice x
+    :param iy: numpy.ndarray of lattice y
+    :return: numpy.ndarray of uint64
+    """
+    mask = numpy.uint64(0xffffffff)
+    ix = numpy.asarray(ix, dtype=numpy.int64).astype(numpy.uint64)
+    iy = numpy.asarray(iy, dtype=numpy.int64).astype(numpy.uint64)
+    h = (numpy.uint64((seed * 0x9E3779B1) & 0xffffffff) + ix * numpy.uint64(0x85EBCA77) +
+         iy * numpy.uint64(0xC2B2AE3D)) & mask
+    h ^= h >> numpy.uint64(15)
+    h = (h * numpy.uint64(0x2C1B3C6D)) & mask
+    h ^= h >> numpy.uint64(12)
+    h = (h * numpy.uint64(0x297A2D39)) & mask
+    h ^= h >> numpy.uint64(15)
+    return h
+
+
+def _hash_noise(seed, x, y):
+    """
+    Single point of Perlin noise over the hash based gradient lattice
+    :param seed: int
+    :param x: float lattice x
+    :param y: float lattice y
+    :return: float
+    """
+    x0 = math.floor(x)
+    y0 = math.floor(y)
+    x1 = x0 + 1.0
+    y1 = y0 + 1.0
+    ix0, ix1, iy0, iy1 = int(x0), int(x1), int(y0), int(y1)
+    g = _HASH_GRADIENTS[_lattice_hash(seed, ix0, iy0) & 255]
+    s = (g[0]*(x - x0)) + (g[1]*(y - y0))
+    g = _HASH_GRADIENTS[_lattice_hash(seed, ix1, iy0) & 255]
+    t = (g[0]*(x - x1)) + (g[1]*(y - y0))
+    g = _HASH_GRADIENTS[_lattice_hash(seed, ix0, iy1) & 255]
+    u = (g[0]*(x - x0)) + (g[1]*(y - y1))
+    g = _HASH_GRADIENTS[_lattice_hash(seed, ix1, iy1) & 255]
+    v = (g[0]*(x - x1)) + (g[1]*(y - y1))
+    d = x - x0
+    sx = (3*d*d) - (2*d*d*d)
+    a = s + sx*t - sx*s
+    b = u + sx*v - sx*u
+    d = y - y0
+    sy = (3*d*d) - (2*d*d*d)
+    return a + sy*b - sy*a
+
+
+def _hash_noise_array(seed, px, py):
+    """
+    NumPy version of _hash_noise for a whole grid of points.  Mirrors _hash_noise step for step so the results match.
+    :param seed: int
+    :param px: numpy.ndarray of lattice x with shape (1, width)
+    :param py: numpy.ndarray of lattice y with shape (height, 1)
+    :return: numpy.ndarray of float64 with shape (height, width)
+    """
+    x0 = numpy.floor(px)
+    y0 = numpy.floor(py)
+    x1 = x0 + 1.0
+    y1 = y0 + 1.0
+    # the grid is separable, so broadcasting the (1, width) corner columns against the (height, 1) corner rows
+    # hashes exactly the corners that are sampled, memory stays proportional to width*height at any frequency
+    ix0 = x0.astype(numpy.int64)
+    iy0 = y0.astype(numpy.int64)
+    ix1 = ix0 + 1
+    iy1 = iy0 + 1
+
+    def gradient(ix, iy):
+        index = (_lattice_hash_array(seed, ix, iy) & numpy.uint64(255)).astype(numpy.intp)
+        return _HASH_GRADIENT_ARRAY[index, 0], _HASH_GRADIENT_ARRAY[index, 1]
+
+    gx, gy = gradient(ix0, iy0)
+    s = (gx*(px - x0)) + (gy*(py - y0))
+    gx, gy = gradient(ix1, iy0)
+    t = (gx*(px - x1)) + (gy*(py - y0))
+    gx, gy = gradient(ix0, iy1)
+    u = (gx*(px - x0)) + (gy*(py - y1))
+    gx, gy = gradient(ix1, iy1)
+    v = (gx*(px - x1)) + (gy*(py - y1))
+    d = px - x0
+    sx = (3*d*d) - (2*d*d*d)
+    a = s + sx*t - sx*s
+    b = u + sx*v - sx*u
+    d = py - y0
+    sy = (3*d*d) - (2*d*d*d)
+    return a + sy*b - sy*a
+
+
+class PerlinChunks(object):
+    """
+    Perlin Chunks
+
+    An unbounded 2D Perlin noise field that is generated on demand in square chunks of chunk_size*chunk_size cells.
+    Gradients come from a seeded hash of the lattice coordinate instead of a pre-built table, so any chunk can be
+    generated on its own and neighbouring chunks line up without seams.
+
+    Recently used chunks are kept in an LRU cache, the least recently used chunks are dropped once the cache holds
+    more than cache_bytes.  Chunks use the same 0 - 255 range and row layout as Perlin2D.noise_map, cell (x, y) of a
+    chunk is at chunk[y*chunk_size+x].  Chunks are uint8 numpy.ndarray objects when NumPy is used, otherwise bytearray.
+    """
+
+    STEP_X = Perlin2D.STEP_X
+    STEP_Y = Perlin2D.STEP_Y
+
+    def __init__(self, chunk_size=64, seed=0, cache_bytes=16*1024*1024, use_numpy=None):
+        if chunk_size < 1:
+            raise ValueError("PerlinChunks chunk_size must be at least 1")
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.cache_bytes = cache_bytes
+        self.use_numpy = resolve_use_numpy("PerlinChunks", use_numpy)
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+
+    def chunk(self, cx, cy):
+        """
+        Return chunk (cx, cy), generating it if it is not cached
+        :param cx: int chunk x
+        :param cy: int chunk y
+        :return: numpy.ndarray|bytearray of chunk_size*chunk_size
+        """
+        key = (cx, cy)
+        data = self._cache.get(key)
+        if data is not None:
+            self._cache.move_to_end(key)
+            return data
+        if self.use_numpy:
+            data = self._generate_numpy(cx, cy)
+        else:
+            data = self._generate_scalar(cx, cy)
+        self._cache[key] = data
+        self._cached_bytes += len(data)
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cached_bytes -= len(old)
+        return data
+
+    def is_cached(self, cx, cy):
+        """
+        Check if chunk (cx, cy) is currently in the cache
+        :param cx: int chunk x
+        :param cy: int chunk y
+        :return: bool
+        """
+        return (cx, cy) in self._cache
+
+    def discard(self, cx, cy):
+        """
+        Drop chunk (cx, cy) from the cache, does nothing if it is not cached
+        :param cx: int chunk x
+        :param cy: int chunk y
+        :return: None
+        """
+        data = self._cache.pop((cx, cy), None)
+        if data is not None:
+            self._cached_bytes -= len(data)
+
+    def clear(self):
+        """
+        Clear the chunk cache
+        :return: None
+        """
+        self._cache.clear()
+        self._cached_bytes = 0
+
+    def cached_bytes(self):
+        """
+        Return the number of bytes held by cached chunks
+        :return: int
+        """
+        return self._cached_bytes
+
+    def _generate_scalar(self, cx, cy):
+        """
+        Evaluates one chunk a cell at a time in pure Python
+        :param cx: int chunk x
+        :param cy: int chunk y
+        :return: bytearray
+        """
+        n = self.chunk_size
+        data = bytearray(n*n)
+        for y in range(0, n):
+            y0 = (cy*n + y) * self.STEP_Y
+            for x in range(0, n):
+                a = int(round((128-(128*(_hash_noise(self.seed, (cx*n + x) * self.STEP_X, y0))))))
+                data[y*n+x] = min(max(a, 0), 255)
+        return data
+
+    def _generate_numpy(self, cx, cy):
+        """
+        Evaluates one chunk with whole-array operations
+        :param cx: int chunk x
+        :param cy: int chunk y
+        :return: numpy.ndarray of uint8
+        """
+        n = self.chunk_size
+        px = (numpy.arange(cx*n, cx*n + n, dtype=numpy.int64).astype(numpy.float64) * self.STEP_X)[numpy.newaxis, :]
+        py = (numpy.arange(cy*n, cy*n + n, dtype=numpy.int64).astype(numpy.float64) * self.STEP_Y)[:, numpy.newaxis]
+        values = numpy.round(128-(128*_hash_noise_array(self.seed, px, py)))
+        return numpy.clip(values, 0, 255).astype(numpy.uint8).ravel()
+
+
+def _fractal_band(settings, width, x_offset, y_start, rows):
+    """
+    Generates rows [y_start, y_start+rows) of a fractal noise map.  Module level so ProcessPoolExecutor can pickle it.
+    :param settings: tuple of (seed, octaves, frequency, lacunarity, persistence, use_numpy)
+    :param width: int
+    :param x_offset: int world x of the first column
+    :param y_start: int world y of the first row
+    :param rows: int
+    :return: numpy.ndarray|bytearray of width*rows
+    """
+    seed, octaves, frequency, lacunarity, persistence, use_numpy = settings
+    amplitude_sum = sum(persistence ** i for i in range(0, octaves))
+    if use_numpy:
+        cols = numpy.arange(x_offset, x_offset + width, dtype=numpy.int64).astype(numpy.float64)[numpy.newaxis, :]
+        lines = numpy.arange(y_start, y_start + rows, dtype=numpy.int64).astype(numpy.float64)[:, numpy.newaxis]
+        total = numpy.zeros((rows, width), dtype=numpy.float64)
+        for i in range(0, octaves):
+            f = frequency * (lacunarity ** i)
+            total += (persistence ** i) * _hash_noise_array(seed + i, cols * f, lines * f)
+        values = numpy.round(128-(128*(total / amplitude_sum)))
+        return numpy.clip(values, 0, 255).astype(numpy.uint8).ravel()
+    data = bytearray(width*rows)
+    for y in range(0, rows):
+        for x in range(0, width):
+            total = 0.0
+            for i in range(0, octaves):
+                f = frequency * (lacunarity ** i)
+                total += (persistence ** i) * _hash_noise(seed + i, (x_offset + x) * f, (y_start + y) * f)
+            a = int(round((128-(128*(total / amplitude_sum)))))
+            data[y*width+x] = min(max(a, 0), 255)
+    return data
+
+
+class FractalNoise(object):
+    """
+    Fractal Noise
+
+    Fractional Brownian motion (fBm) built from several octaves of the hash based Perlin noise used by PerlinChunks.
+    Each octave multiplies the frequency by lacunarity and the amplitude by persistence, octave i is seeded with
+    seed+i.  frequency is the lattice distance between two neighbouring cells of the first octave.
+
+    Maps are generated in bands of rows.  With workers other than 1 the bands are computed in a ProcessPoolExecutor
+    (workers=None uses every core).  Every band is a pure function of the settings so the result is the same no
+    matter how the work was split.
+    """
+
+    def __init__(self, seed=0, octaves=4, frequency=Perlin2D.STEP_X, lacunarity=2.0, persistence=0.5,
+                 use_numpy=None):
+        if octaves < 1:
+            raise ValueError("FractalNoise needs at least one octave")
+        self.seed = seed
+        self.octaves = octaves
+        self.frequency = frequency
+        self.lacunarity = lacunarity
+        self.persistence = persistence
+        self.use_numpy = resolve_use_numpy("FractalNoise", use_numpy)
+
+    def _settings(self):
+        return self.seed, self.octaves, self.frequency, self.lacunarity, self.persistence, self.use_numpy
+
+    def generate(self, width, height, x_offset=0, y_offset=0, workers=1, band_rows=128):
+        """
+        Generate a width*height noise map starting at world cell (x_offset, y_offset)
+        :param width: int
+        :param height: int
+        :param x_offset: int
+        :param y_offset: int
+        :param workers: int number of worker processes, 1 generates in this process, None uses every core
+        :param band_rows: int number of rows handed to a worker at a time
+        :return: numpy.ndarray of uint8 when NumPy is used, otherwise bytearray.  Cell (x, y) is at [y*width+x]
+        """
+        settings = self._settings()
+        bands = [(y, min(band_rows, height - y)) for y in range(0, height, band_rows)]
+        if workers == 1 or len(bands) < 2:
+            parts = [_fractal_band(settings, width, x_offset, y_offset + y, rows) for y, rows in bands]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_fractal_band, settings, width, x_offset, y_offset + y, rows)
+                           for y, rows in bands]
+                parts = [f.result() for f in futures]
+        if self.use_numpy:
+            if not parts:
+                return numpy.zeros(0, dtype=numpy.uint8)
+            return numpy.concatenate(parts)
+        return bytearray().join(parts)
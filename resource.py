@@ -1,6 +1,21 @@
 from os import path
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import io
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from queue import Empty
 import pygame
 import json
+from container import ThreadSafeQueue
 
 
 def load_image(image_dir, image_name, color_key=None, use_alpha=False):
@@ -31,7 +46,7 @@ def load_font(font_dir, font_name, font_size):
 def load_sprite_sheet(sheet_surface, sheet_map, image_manager=None):
     if not type(sheet_surface) == pygame.Surface:
         raise TypeError("load_sprite_sheet expects a pygame.Surface object, not a {}".format(type(sheet_surface)))
-    if not type(sheet_map) == dict:
+    if not isinstance(sheet_map, Mapping):
         raise TypeError("load_sprite_sheet expects a dict map not a {}".format(type(sheet_map)))
     sub_images = {}
     for key, rect in sheet_map.items():
@@ -54,3 +69,630 @@ def load_sprite_sheet_map_from_json(json_file) -> dict:
     for key, map_data in j_data.items():
         j_sprite_map[key] = pygame.Rect(map_data['x'], map_data['y'], map_data['w'], map_data['h'])
     return j_sprite_map
+
+
+_SPRITE_MAP_MAGIC = b'PGLS'
+_SPRITE_MAP_VERSION = 1
+# magic, version, byte order, json mtime_ns, json size, json sha1, entry count
+_SPRITE_MAP_HEADER = struct.Struct('<4sHcxqQ20sI')
+_BYTE_ORDER = b'L' if sys.byteorder == 'little' else b'B'
+
+
+class SpriteMap(Mapping):
+    """
+    Read-only sprite map backed by a memory-mapped compiled map file, see load_sprite_sheet_map.  Behaves like the
+    dict returned by load_sprite_sheet_map_from_json, but each pygame.Rect is only created the first time its key
+    is looked up.
+    """
+
+    def __init__(self, map_file):
+        with open(map_file, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        count = _SPRITE_MAP_HEADER.unpack_from(self._mmap, 0)[-1]
+        start = _SPRITE_MAP_HEADER.size
+        end = start + count * 16
+        self._values = memoryview(self._mmap)[start:end].cast('i')
+        keys = self._mmap[end:].decode('utf-8').split('\0') if count else []
+        self._index = dict(zip(keys, range(0, count)))
+        self._rects = {}
+
+    def __getitem__(self, key):
+        rect = self._rects.get(key)
+        if rect is None:
+            i = self._index[key] * 4
+            v = self._values
+            rect = self._rects[key] = pygame.Rect(v[i], v[i + 1], v[i + 2], v[i + 3])
+        return rect
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        """
+        Release the memory map, Rects already handed out stay valid
+        :return: None
+        """
+        if self._values is not None:
+            self._values.release()
+            self._values = None
+            self._mmap.close()
+
+
+def _read_sprite_map_header(map_file):
+    try:
+        with open(map_file, "rb") as handle:
+            data = handle.read(_SPRITE_MAP_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(data) != _SPRITE_MAP_HEADER.size:
+        return None
+    header = _SPRITE_MAP_HEADER.unpack(data)
+    if header[:3] != (_SPRITE_MAP_MAGIC, _SPRITE_MAP_VERSION, _BYTE_ORDER):
+        return None
+    return header
+
+
+def compile_sprite_map(json_file, map_file=None):
+    """
+    Compile a JSON sprite map into the binary format read by SpriteMap.  The map is parsed with
+    load_sprite_sheet_map_from_json, so the JSON stays the source of truth.
+    :param json_file: full path of the JSON sprite map
+    :param map_file: full path of the compiled map, defaults to json_file + '.bin'
+    :return: str path of the compiled map
+    """
+    if map_file is None:
+        map_file = json_file + ".bin"
+    with open(json_file, "rb") as handle:
+        digest = hashlib.sha1(handle.read()).digest()
+    st = os.stat(json_file)
+    sprite_map = load_sprite_sheet_map_from_json(json_file)
+    values = array('i')
+    for key, rect in sprite_map.items():
+        if '\0' in key:
+            raise ValueError("Sprite map key {!r} contains a NUL character".format(key))
+        values.extend((rect.x, rect.y, rect.w, rect.h))
+    keys = '\0'.join(sprite_map.keys()).encode('utf-8')
+    fd, tmp_path = tempfile.mkstemp(dir=path.dirname(path.abspath(map_file)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(_SPRITE_MAP_HEADER.pack(_SPRITE_MAP_MAGIC, _SPRITE_MAP_VERSION, _BYTE_ORDER, st.st_mtime_ns,
+                                                 st.st_size, digest, len(sprite_map)))
+            values.tofile(handle)
+            handle.write(keys)
+        os.replace(tmp_path, map_file)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return map_file
+
+
+def load_sprite_sheet_map(json_file, map_file=None) -> SpriteMap:
+    """
+    Load a sprite map through its compiled copy, recompiling it when the JSON has changed.  A changed mtime or size
+    only triggers a recompile when the JSON's sha1 differs too, otherwise the stored mtime is refreshed.
+    :param json_file: full path of the JSON sprite map
+    :param map_file: full path of the compiled map, defaults to json_file + '.bin'
+    :return: SpriteMap
+    """
+    if not path.isfile(json_file):
+        raise FileNotFoundError("load_sprite_sheet_map expects JSON file to be a full path")
+    if map_file is None:
+        map_file = json_file + ".bin"
+    st = os.stat(json_file)
+    header = _read_sprite_map_header(map_file)
+    if header is None:
+        compile_sprite_map(json_file, map_file)
+    elif header[3:5] != (st.st_mtime_ns, st.st_size):
+        with open(json_file, "rb") as handle:
+            digest = hashlib.sha1(handle.read()).digest()
+        if digest != header[5]:
+            compile_sprite_map(json_file, map_file)
+        else:
+            with open(map_file, "r+b") as handle:
+                handle.write(_SPRITE_MAP_HEADER.pack(*(header[:3] + (st.st_mtime_ns, st.st_size) + header[5:])))
+    return SpriteMap(map_file)
+
+
+def _read_image(full_path):
+    """
+    Read and decode an image file without converting it, safe to call off the main thread
+    :param full_path: str
+    :return: pygame.Surface
+    """
+    # open() reports a missing file itself, no separate stat call
+    try:
+        with open(full_path, "rb") as handle:
+            data = handle.read()
+    except FileNotFoundError:
+        raise FileNotFoundError("Expected image file {} was not found".format(full_path)) from None
+    # decoding from a file object releases the GIL while the image library works
+    return pygame.image.load(io.BytesIO(data), path.basename(full_path))
+
+
+def _read_font(full_path):
+    """
+    Read a font file into memory, the Font itself is created on the main thread
+    :param full_path: str
+    :return: bytes
+    """
+    try:
+        with open(full_path, "rb") as handle:
+            return handle.read()
+    except FileNotFoundError:
+        raise FileNotFoundError("Expected font file {} was not found".format(full_path)) from None
+
+
+def _font_path(font_dir, font_name):
+    file, ext = path.splitext(font_name)
+    if ext == '':
+        font_name = "{}.ttf".format(font_name)
+    return path.join(font_dir, font_name)
+
+
+def _convert_image(surface, color_key=None, use_alpha=False):
+    if use_alpha:
+        surface = surface.convert_alpha()
+    else:
+        surface = surface.convert()
+    if color_key is not None:
+        surface.set_colorkey(color_key)
+    return surface
+
+
+def _timed(reader, full_path):
+    start = time.perf_counter()
+    try:
+        return reader(full_path), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+class LoadReport(object):
+    """
+    Result of load_images / load_fonts
+
+    assets maps key to the loaded object, failures is a list of (key, exception) for every asset that did not load
+    and timings maps key to (read_seconds, finish_seconds): time spent reading and decoding on the thread pool and
+    converting or creating the font on the main thread.
+    """
+
+    def __init__(self):
+        self.assets = {}
+        self.failures = []
+        self.timings = {}
+
+    @property
+    def ok(self):
+        """
+        True if every asset loaded
+        """
+        return not self.failures
+
+    def slowest(self, count=10):
+        """
+        Return the assets that took longest to load
+        :param count: int
+        :return: list of (key, total_seconds), slowest first
+        """
+        totals = [(key, read + finish) for key, (read, finish) in self.timings.items()]
+        totals.sort(key=lambda t: t[1], reverse=True)
+        return totals[:count]
+
+    def raise_failures(self):
+        """
+        Raise a single error listing every failed asset, does nothing if everything loaded
+        :return: None
+        """
+        if self.failures:
+            lines = ["{}: {}".format(key, error) for key, error in self.failures]
+            raise RuntimeError("{} assets failed to load\n{}".format(len(self.failures), "\n".join(lines)))
+
+
+def _load_batch(manifest, reader, paths, finish, max_workers):
+    report = LoadReport()
+    keys = list(manifest.keys())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_timed, [reader] * len(keys), [paths(manifest[k]) for k in keys]))
+    # converting needs the display, so it runs here on the calling thread in one pass
+    for key, (data, error, read_time) in zip(keys, results):
+        start = time.perf_counter()
+        if error is None:
+            try:
+                report.assets[key] = finish(data, manifest[key])
+            except Exception as e:
+                error = e
+        if error is not None:
+            report.failures.append((key, error))
+        report.timings[key] = (read_time, time.perf_counter() - start)
+    return report
+
+
+def load_images(manifest, image_manager=None, max_workers=4):
+    """
+    Load many images at once.  Files are read and decoded on a thread pool, then converted on the calling thread.
+    Missing or broken files do not stop the batch, they are collected in the report's failures.
+    :param manifest: dict of key to (image_dir, image_name, color_key, use_alpha), trailing items are optional
+    :param image_manager: ImageManager the loaded images are also added to
+    :param max_workers: int
+    :return: LoadReport
+    """
+    def finish(surface, args):
+        return _convert_image(surface, *args[2:])
+    report = _load_batch(manifest, _read_image, lambda args: path.join(args[0], args[1]), finish, max_workers)
+    if image_manager is not None:
+        for key, surface in report.assets.items():
+            image_manager.add_image(key, surface)
+    return report
+
+
+def load_fonts(manifest, font_manager=None, max_workers=4):
+    """
+    Load many fonts at once.  Font files are read on a thread pool and the Fonts are created on the calling thread.
+    :param manifest: dict of key to (font_dir, font_name, font_size)
+    :param font_manager: FontManager the loaded fonts are also added to
+    :param max_workers: int
+    :return: LoadReport
+    """
+    def finish(data, args):
+        return pygame.font.Font(io.BytesIO(data), args[2])
+    report = _load_batch(manifest, _read_font, lambda args: _font_path(args[0], args[1]), finish, max_workers)
+    if font_manager is not None:
+        for key, font in report.assets.items():
+            font_manager.add_font(key, font)
+    return report
+
+
+class AssetPrefetcher(object):
+    """
+    Loads images and fonts in the background and feeds them into an ImageManager / FontManager
+
+    Files are read and decoded on a thread pool.  The finished results are handed to the main thread through pump(),
+    which runs convert()/convert_alpha(), set_colorkey and creates fonts there, then adds them to the managers.  Call
+    pump() once per frame from a loading screen; the progress callback receives (done, total, key).
+    """
+
+    def __init__(self, image_manager=None, font_manager=None, max_workers=4, progress=None):
+        self.image_manager = image_manager
+        self.font_manager = font_manager
+        self.progress = progress
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._finished = ThreadSafeQueue()
+        self._futures = {}
+        self._total = 0
+        self._done = 0
+
+    def prefetch(self, images=None, fonts=None):
+        """
+        Queue files for loading.  Keys already in the managers resolve right away.
+        :param images: dict of key to (image_dir, image_name, color_key, use_alpha), trailing items are optional
+        :param fonts: dict of key to (font_dir, font_name, font_size)
+        :return: dict of key to concurrent.futures.Future, resolved by pump() with the converted surface or font
+        """
+        futures = {}
+        for key, args in (images or {}).items():
+            futures[key] = self._submit('image', key, args)
+        for key, args in (fonts or {}).items():
+            futures[key] = self._submit('font', key, args)
+        return futures
+
+    def _submit(self, kind, key, args):
+        manager = self.image_manager if kind == 'image' else self.font_manager
+        if manager is None:
+            raise RuntimeError("AssetPrefetcher has no {} manager".format(kind))
+        future = Future()
+        if manager.has(key):
+            future.set_result(manager.get(key))
+            return future
+        if key in self._futures:
+            return self._futures[key]
+        self._futures[key] = future
+        self._total += 1
+        if kind == 'image':
+            full_path = path.join(args[0], args[1])
+            self._executor.submit(self._work, kind, key, args, _read_image, full_path)
+        else:
+            self._executor.submit(self._work, kind, key, args, _read_font, _font_path(args[0], args[1]))
+        return future
+
+    def _work(self, kind, key, args, reader, full_path):
+        try:
+            self._finished.enqueue((kind, key, args, reader(full_path), None))
+        except BaseException as e:
+            self._finished.enqueue((kind, key, args, None, e))
+
+    def pump(self, time_budget=None):
+        """
+        Finish loads on the main thread: convert surfaces, create fonts and add them to the managers
+        :param time_budget: float|None seconds to spend before returning, None finishes everything that is ready
+        :return: int number of assets finished by this call
+        """
+        start = time.perf_counter()
+        finished = 0
+        while time_budget is None or not finished or time.perf_counter() - start < time_budget:
+            try:
+                item = self._finished.get_nowait()
+            except Empty:
+                break
+            self._finish(*item)
+            finished += 1
+        return finished
+
+    def _finish(self, kind, key, args, data, error):
+        future = self._futures.pop(key)
+        if error is None:
+            try:
+                if kind == 'image':
+                    obj = _convert_image(data, *args[2:])
+                    self.image_manager.add_image(key, obj)
+                else:
+                    obj = pygame.font.Font(io.BytesIO(data), args[2])
+                    self.font_manager.add_font(key, obj)
+                future.set_result(obj)
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future.set_exception(error)
+        self._done += 1
+        if self.progress is not None:
+            self.progress(self._done, self._total, key)
+
+    def pending(self):
+        """
+        Return the number of queued assets that have not been finished by pump()
+        :return: int
+        """
+        return self._total - self._done
+
+    def finish(self, timeout=None):
+        """
+        Block, pumping results, until every queued asset is finished
+        :param timeout: float|None seconds to wait
+        :return: bool True if everything finished
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending() > 0:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                item = self._finished.get(timeout=remaining if remaining is None else max(remaining, 0))
+            except Empty:
+                return False
+            self._finish(*item)
+        return True
+
+    def shutdown(self):
+        """
+        Stop the worker threads.  Every asset not finished by pump() yet is cancelled, its future raises
+        concurrent.futures.CancelledError, and pending() drops back to 0.
+        :return: None
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        # loads that completed while shutting down are dropped along with the cancelled ones
+        while True:
+            try:
+                self._finished.get_nowait()
+            except Empty:
+                break
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._total = 0
+        self._done = 0
+
+
+def _file_stamp(full_path):
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class AssetWatcher(object):
+    """
+    Loads assets into managers and reloads them when their files change
+
+    Every watched key remembers the files it was built from.  A background thread started with start() polls those
+    files with os.stat (standard library only, so no inotify) and reads and decodes just the assets whose files
+    changed.  pump(), called once per frame on the main thread, converts the new surfaces, re-cuts sprite sheets into
+    subsurfaces and replaces the affected keys in the managers; nothing else is reloaded.  on_reload is called on the
+    main thread from pump() with the list of manager keys that were replaced, which is the place to invalidate
+    derived caches such as VariantCache or TextRenderer.
+    """
+
+    def __init__(self, image_manager=None, font_manager=None, interval=0.5, on_reload=None):
+        self.image_manager = image_manager
+        self.font_manager = font_manager
+        self.interval = interval
+        self.on_reload = on_reload
+        self._assets = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        self._ready = ThreadSafeQueue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch_image(self, image_key, image_dir, image_name, color_key=None, use_alpha=False):
+        """
+        Load an image into the ImageManager and reload it when the file changes
+        :return: pygame.Surface
+        """
+        surface = load_image(image_dir, image_name, color_key, use_alpha)
+        self.image_manager.add_image(image_key, surface)
+        asset = {'kind': 'image', 'image': path.join(image_dir, image_name), 'color_key': color_key,
+                 'use_alpha': use_alpha, 'keys': [image_key]}
+        self._track(image_key, asset, [asset['image']])
+        return surface
+
+    def watch_sprite_sheet(self, sheet_key, image_dir, image_name, json_file, color_key=None, use_alpha=False):
+        """
+        Load a sprite sheet and its JSON map into the ImageManager.  A change to either file re-cuts the sheet:
+        every subsurface is replaced, keys added to the map are added and keys removed from it are removed.
+        :param sheet_key: name of the sheet, used with unwatch(); the sheet itself is not added to the ImageManager
+        :return: dict of key to pygame.Surface
+        """
+        sheet = load_image(image_dir, image_name, color_key, use_alpha)
+        images = load_sprite_sheet(sheet, load_sprite_sheet_map_from_json(json_file))
+        for key, surface in images.items():
+            self.image_manager.add_image(key, surface)
+        asset = {'kind': 'sheet', 'image': path.join(image_dir, image_name), 'json': json_file,
+                 'color_key': color_key, 'use_alpha': use_alpha, 'keys': list(images.keys())}
+        self._track(sheet_key, asset, [asset['image'], json_file])
+        return images
+
+    def watch_font(self, font_key, font_dir, font_name, font_size):
+        """
+        Load a font into the FontManager and reload it when the file changes
+        :return: pygame.font.Font
+        """
+        font = load_font(font_dir, font_name, font_size)
+        self.font_manager.add_font(font_key, font)
+        asset = {'kind': 'font', 'font': _font_path(font_dir, font_name), 'size': font_size, 'keys': [font_key]}
+        self._track(font_key, asset, [asset['font']])
+        return font
+
+    def _track(self, asset_key, asset, files):
+        with self._lock:
+            self._untrack(asset_key)
+            asset['files'] = [path.abspath(f) for f in files]
+            self._assets[asset_key] = asset
+            for full_path in asset['files']:
+                entry = self._files.setdefault(full_path, [_file_stamp(full_path), set()])
+                entry[1].add(asset_key)
+
+    def _untrack(self, asset_key):
+        asset = self._assets.pop(asset_key, None)
+        if asset is None:
+            return
+        for full_path in asset['files']:
+            entry = self._files.get(full_path)
+            if entry is not None:
+                entry[1].discard(asset_key)
+                if not entry[1]:
+                    del self._files[full_path]
+
+    def unwatch(self, asset_key):
+        """
+        Stop watching an image, sprite sheet or font, its keys stay in the managers
+        :param asset_key: key passed to watch_image, watch_sprite_sheet or watch_font
+        :return: None
+        """
+        with self._lock:
+            self._untrack(asset_key)
+
+    def watched_files(self):
+        """
+        Return the files being watched and the asset keys built from each
+        :return: dict of full path to set of asset keys
+        """
+        with self._lock:
+            return {full_path: set(entry[1]) for full_path, entry in self._files.items()}
+
+    def poll(self):
+        """
+        Check every watched file once and read the assets built from changed files.  Runs on the background thread
+        after start(), or can be called directly.  Results are applied by pump().
+        :return: int number of assets queued for reloading
+        """
+        changed = set()
+        with self._lock:
+            for full_path, entry in self._files.items():
+                stamp = _file_stamp(full_path)
+                if stamp != entry[0]:
+                    entry[0] = stamp
+                    # a deleted file keeps the old asset until it comes back
+                    if stamp is not None:
+                        changed.update(entry[1])
+            assets = [(key, self._assets[key]) for key in changed]
+        for asset_key, asset in assets:
+            try:
+                data = self._read(asset)
+            except Exception as e:
+                # usually a file caught half written, the next change to it is picked up again
+                logging.getLogger(__name__).warning("Reloading %s failed: %s", asset_key, e)
+                continue
+            self._ready.enqueue((asset_key, asset, data))
+        return len(assets)
+
+    @staticmethod
+    def _read(asset):
+        if asset['kind'] == 'image':
+            return _read_image(asset['image'])
+        if asset['kind'] == 'sheet':
+            return _read_image(asset['image']), load_sprite_sheet_map_from_json(asset['json'])
+        return _read_font(asset['font'])
+
+    def pump(self):
+        """
+        Apply finished reloads on the main thread: convert surfaces, cut sprite sheets and replace manager keys
+        :return: list of manager keys that were replaced or removed
+        """
+        reloaded = []
+        while True:
+            try:
+                asset_key, asset, data = self._ready.get_nowait()
+            except Empty:
+                break
+            with self._lock:
+                if self._assets.get(asset_key) is not asset:
+                    # unwatched or watched again since it was read
+                    continue
+            try:
+                reloaded.extend(self._apply(asset, data))
+            except Exception as e:
+                logging.getLogger(__name__).warning("Reloading %s failed: %s", asset_key, e)
+        if reloaded and self.on_reload is not None:
+            self.on_reload(reloaded)
+        return reloaded
+
+    def _apply(self, asset, data):
+        if asset['kind'] == 'image':
+            self.image_manager.add_image(asset['keys'][0], _convert_image(data, asset['color_key'],
+                                                                           asset['use_alpha']))
+            return list(asset['keys'])
+        if asset['kind'] == 'sheet':
+            surface, sheet_map = data
+            images = load_sprite_sheet(_convert_image(surface, asset['color_key'], asset['use_alpha']), sheet_map)
+            removed = [key for key in asset['keys'] if key not in images]
+            for key in removed:
+                self.image_manager.remove(key)
+            for key, image in images.items():
+                self.image_manager.add_image(key, image)
+            asset['keys'] = list(images.keys())
+            return removed + asset['keys']
+        self.font_manager.add_font(asset['keys'][0], pygame.font.Font(io.BytesIO(data), asset['size']))
+        return list(asset['keys'])
+
+    def start(self):
+        """
+        Start polling on a background thread every interval seconds
+        :return: None
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="AssetWatcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        """
+        Stop the background thread, reloads already read can still be applied with pump()
+        :return: None
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
@@ -1,6 +1,20 @@
 from pygame import Color
 
 
+def resolve(color):
+    """
+    Resolve a colour name from this module such as 'DARK_BLUE' (any case) or a color like object into a new Color
+    :param color: str|pygame.Color|tuple
+    :return: pygame.Color
+    """
+    if isinstance(color, str):
+        value = globals().get(color.upper())
+        if not isinstance(value, Color):
+            raise ValueError("{} is not a color defined in rgbcolor".format(color))
+        return Color(value)
+    return Color(color)
+
+
 BLACK = Color(0, 0, 0, 255)
 WHITE = Color(255, 255, 255, 255)
 RED = Color(255, 0, 0, 255)
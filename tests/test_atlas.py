@@ -0,0 +1,96 @@
+import unittest
+import os
+import tempfile
+from atlas import *
+from manager import ImageManager
+import pygame
+from pygame import Surface, Rect
+
+
+class TestAtlas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pygame.init()
+        self._d = pygame.display.set_mode((100, 100))
+        self._tmp = tempfile.TemporaryDirectory()
+        self.image_dir = os.path.join(self._tmp.name, "images")
+        self.out_dir = os.path.join(self._tmp.name, "out")
+        os.makedirs(os.path.join(self.image_dir, "ui"))
+        self.sizes = {
+            "red": ((40, 30), (255, 0, 0, 255)),
+            "green": ((20, 50), (0, 255, 0, 255)),
+            "blue": ((16, 16), (0, 0, 255, 128)),
+            "ui/button": ((60, 20), (10, 20, 30, 255)),
+        }
+        for key, (size, color) in self.sizes.items():
+            s = Surface(size, pygame.SRCALPHA, 32)
+            s.fill(color)
+            pygame.image.save(s, os.path.join(self.image_dir, key + ".png"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        pygame.quit()
+
+    def test_max_rects_bin(self):
+        b = MaxRectsBin(64, 64)
+        placed = [b.insert(32, 32) for _ in range(0, 4)]
+        self.assertNotIn(None, placed)
+        for i, r in enumerate(placed):
+            self.assertTrue(Rect(0, 0, 64, 64).contains(r))
+            self.assertEqual(-1, r.collidelist(placed[:i] + placed[i + 1:]))
+        self.assertIsNone(b.insert(1, 1))
+        self.assertIsNone(MaxRectsBin(16, 16).insert(17, 1))
+
+    def test_pack_and_load(self):
+        index = pack_atlas(self.image_dir, self.out_dir)
+        self.assertTrue(os.path.isfile(index))
+        sheets, maps = read_atlas_index(index)
+        self.assertEqual(["atlas_0.png"], sheets)
+        self.assertEqual(set(self.sizes.keys()), set(maps[0].keys()))
+        images = load_atlas(index)
+        for key, (size, color) in self.sizes.items():
+            self.assertEqual(size, images[key].get_size())
+            self.assertEqual(pygame.Color(*color), images[key].get_at((size[0] - 1, size[1] - 1)))
+        # every image is a view into the same sheet
+        parents = set(id(img.get_parent()) for img in images.values())
+        self.assertEqual(1, len(parents))
+        im = ImageManager()
+        self.assertIsNone(load_atlas(index, im))
+        self.assertEqual((60, 20), im.get("ui/button").get_size())
+
+    def test_pack_multiple_sheets(self):
+        index = pack_atlas(self.image_dir, self.out_dir, name="small", max_size=64, padding=2)
+        sheets, maps = read_atlas_index(index)
+        self.assertGreater(len(sheets), 1)
+        for sheet, sheet_map in zip(sheets, maps):
+            rects = list(sheet_map.values())
+            for i, r in enumerate(rects):
+                self.assertEqual(-1, r.inflate(2, 2).move(1, 1).collidelist(rects[:i] + rects[i + 1:]))
+        images = load_atlas(index)
+        self.assertEqual(set(self.sizes.keys()), set(images.keys()))
+        self.assertEqual(pygame.Color(0, 255, 0, 255), images["green"].get_at((0, 0)))
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            pack_atlas(os.path.join(self._tmp.name, "missing"), self.out_dir)
+        with self.assertRaises(ValueError):
+            pack_atlas(self.image_dir, self.out_dir, max_size=32)
+        with self.assertRaises(FileNotFoundError):
+            load_atlas(os.path.join(self.out_dir, "missing.atlas"))
+        bad = os.path.join(self._tmp.name, "bad.atlas")
+        with open(bad, "wb") as handle:
+            handle.write(b"NOPE\x01\x00\x00\x00\x00\x00\x00\x00")
+        with self.assertRaises(ValueError):
+            read_atlas_index(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
 import unittest
+import asyncio
+import threading
+import queue
+import random
+from pygame import Rect
 from container import *
+import container
 
 
 class TestContainer(unittest.TestCase):
@@ -42,6 +48,137 @@ class TestContainer(unittest.TestCase):
             self.assertEqual(val, i)
             i += 1
 
+    def test_linked_list_ends(self):
+        t_ll = LinkedList()
+        self.assertIsNone(t_ll.popleft())
+        t_ll.extend([3, 4])
+        t_ll.appendleft(2)
+        t_ll.appendleft(1)
+        t_ll.add(5)
+        self.assertEqual(len(t_ll), 5)
+        self.assertEqual([v for v in t_ll], [1, 2, 3, 4, 5])
+        t_ll.delete(5)
+        t_ll.add(6)
+        t_ll.after(6, 7)
+        t_ll.add(8)
+        self.assertEqual([v for v in t_ll], [1, 2, 3, 4, 6, 7, 8])
+        self.assertEqual(t_ll.popleft(), 1)
+        self.assertEqual(len(t_ll), 6)
+        for _ in range(0, 6):
+            t_ll.popleft()
+        self.assertTrue(t_ll.is_empty())
+        self.assertEqual(len(t_ll), 0)
+        t_ll.add(9)
+        t_ll.extend([])
+        self.assertEqual([v for v in t_ll.copy()], [9])
+
+    def test_linked_list_iteration(self):
+        t_ll = LinkedList()
+        t_ll.extend([1, 2, 3])
+        pairs = [(a, b) for a in t_ll for b in t_ll]
+        self.assertEqual(len(pairs), 9)
+        self.assertEqual(pairs[-1], (3, 3))
+        self.assertEqual(list(reversed(t_ll)), [3, 2, 1])
+        for v in t_ll:
+            t_ll.delete(v)
+        self.assertTrue(t_ll.is_empty())
+        t_ll.extend(range(0, 10))
+        c = t_ll.copy()
+        it = t_ll.iter_removable()
+        with self.assertRaises(RuntimeError):
+            it.remove()
+        for v in it:
+            if v % 3 == 0:
+                it.remove()
+        self.assertEqual(list(t_ll), [1, 2, 4, 5, 7, 8])
+        self.assertEqual(len(t_ll), 6)
+        # removing objects the loop has not reached yet skips them
+        k_ll = LinkedList()
+        k_ll.extend([1, 2, 3, 4])
+        seen = []
+        for v in k_ll:
+            seen.append(v)
+            if v == 1:
+                k_ll.delete(2)
+            if v == 3:
+                k_ll.delete(3)
+                k_ll.delete(4)
+        self.assertEqual(seen, [1, 3])
+        k_ll.extend([5, 6, 7])
+        seen = []
+        for v in reversed(k_ll):
+            seen.append(v)
+            if v == 7:
+                k_ll.delete(6)
+                k_ll.delete(7)
+        self.assertEqual(seen, [7, 5, 1])
+        it = k_ll.iter_removable()
+        seen = []
+        for v in it:
+            seen.append(v)
+            if v == 1:
+                it.remove()
+                k_ll.delete(5)
+        self.assertEqual(seen, [1])
+        self.assertTrue(k_ll.is_empty())
+        t_ll.add(10)
+        self.assertEqual(list(t_ll)[-1], 10)
+        self.assertEqual(len(c), 10)
+        self.assertEqual(c.remove_if(lambda x: x > 6), 3)
+        self.assertEqual(list(c), [0, 1, 2, 3, 4, 5, 6])
+        c.add(7)
+        self.assertEqual(list(c), [0, 1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(c.remove_if(lambda x: True), 8)
+        k_ll = LinkedList()
+        k_ll.extend(range(0, 5))
+
+        def kills(v):
+            if v == 1:
+                k_ll.delete(2)
+            return v in (1, 2)
+        self.assertEqual(k_ll.remove_if(kills), 1)
+        self.assertEqual(list(k_ll), [0, 3, 4])
+        self.assertEqual(len(k_ll), 3)
+        self.assertTrue(c.is_empty())
+        c.add(1)
+        self.assertEqual(list(c), [1])
+
+    def test_linked_list_handles(self):
+        t_ll = LinkedList()
+        two = t_ll.add(2)
+        one = t_ll.appendleft(1)
+        four = t_ll.insert_after(two, 4)
+        three = t_ll.insert_before(four, 3)
+        t_ll.add(5)
+        self.assertEqual(list(t_ll), [1, 2, 3, 4, 5])
+        self.assertEqual(list(reversed(t_ll)), [5, 4, 3, 2, 1])
+        self.assertEqual(t_ll.remove(three), 3)
+        self.assertEqual(t_ll.remove(one), 1)
+        self.assertEqual(list(t_ll), [2, 4, 5])
+        self.assertEqual(list(reversed(t_ll)), [5, 4, 2])
+        self.assertEqual(len(t_ll), 3)
+        with self.assertRaises(ValueError):
+            t_ll.remove(three)
+        with self.assertRaises(ValueError):
+            t_ll.insert_after(one, 9)
+        other = LinkedList()
+        other.add(0)
+        foreign = other.add(1)
+        with self.assertRaises(ValueError):
+            t_ll.remove(foreign)
+        with self.assertRaises(ValueError):
+            t_ll.insert_before(foreign, 9)
+        self.assertEqual(list(other), [0, 1])
+        self.assertEqual(len(t_ll), 3)
+        dup_a = t_ll.add(7)
+        dup_b = t_ll.add(7)
+        t_ll.remove(dup_b)
+        self.assertIs(t_ll.after(7, 8).prev_node, dup_a)
+        self.assertIsNone(t_ll.before(99, 1))
+        self.assertEqual(list(t_ll), [2, 4, 5, 7, 8])
+        t_ll.remove(dup_a)
+        self.assertEqual(list(reversed(t_ll)), [8, 5, 4, 2])
+
     def test_stack(self):
         t_stack = Stack()
         t_stack.push(1)
@@ -90,3 +227,240 @@ class TestContainer(unittest.TestCase):
         t_queue.enqueue(5)
         t_queue.clear()
         self.assertEqual(t_queue.count(), 0)
+
+    def test_queue_bounded(self):
+        t_queue = Queue(3)
+        t_queue.enqueue_many([1, 2, 3])
+        with self.assertRaises(RuntimeError):
+            t_queue.enqueue(4)
+        t_queue.dequeue()
+        with self.assertRaises(RuntimeError):
+            t_queue.enqueue_many([4, 5])
+        self.assertEqual(t_queue.count(), 2)
+        t_queue = Queue(3, 'drop_oldest')
+        t_queue.enqueue_many([1, 2, 3])
+        t_queue.enqueue(4)
+        t_queue.enqueue_many([5])
+        self.assertEqual(t_queue.drain(), [3, 4, 5])
+        t_queue = Queue(3, 'drop_newest')
+        t_queue.enqueue(1)
+        t_queue.enqueue_many([2, 3, 4])
+        t_queue.enqueue(5)
+        self.assertEqual(t_queue.drain(2), [1, 2])
+        self.assertEqual(t_queue.drain(5), [3])
+        self.assertEqual(t_queue.drain(), [])
+        self.assertIsNone(t_queue.dequeue())
+        with self.assertRaises(ValueError):
+            Queue(3, 'drop_all')
+
+    def test_thread_safe_queue(self):
+        t_queue = ThreadSafeQueue()
+        with self.assertRaises(queue.Empty):
+            t_queue.get_nowait()
+        with self.assertRaises(queue.Empty):
+            t_queue.get(timeout=0.01)
+        producer = threading.Thread(target=lambda: [t_queue.put(i) for i in range(0, 100)])
+        producer.start()
+        received = [t_queue.get(timeout=5) for _ in range(0, 100)]
+        producer.join()
+        self.assertEqual(received, list(range(0, 100)))
+        t_queue = ThreadSafeQueue(2)
+        t_queue.enqueue_many([1, 2])
+        with self.assertRaises(queue.Full):
+            t_queue.put(3, timeout=0.01)
+        threading.Timer(0.05, t_queue.dequeue).start()
+        t_queue.put(3, timeout=5)
+        self.assertEqual(t_queue.drain(), [2, 3])
+        self.assertEqual(t_queue.count(), 0)
+
+    def test_async_queue(self):
+        async def run():
+            t_queue = AsyncQueue(2)
+            with self.assertRaises(asyncio.QueueEmpty):
+                t_queue.get_nowait()
+            getter = asyncio.ensure_future(t_queue.get())
+            await asyncio.sleep(0)
+            t_queue.enqueue(1)
+            self.assertEqual(await asyncio.wait_for(getter, 5), 1)
+            await t_queue.put(2)
+            await t_queue.put(3)
+            putter = asyncio.ensure_future(t_queue.put(4))
+            await asyncio.sleep(0)
+            self.assertFalse(putter.done())
+            self.assertEqual(await t_queue.get(), 2)
+            await asyncio.wait_for(putter, 5)
+            self.assertEqual(t_queue.drain(), [3, 4])
+            waiter = asyncio.ensure_future(t_queue.get())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            t_queue.enqueue(5)
+            self.assertEqual(await asyncio.wait_for(t_queue.get(), 5), 5)
+        asyncio.run(run())
+
+    def test_priority_queue(self):
+        t_pq = PriorityQueue()
+        self.assertIsNone(t_pq.pop())
+        values = list(range(0, 200))
+        random.Random(1).shuffle(values)
+        handles = {v: t_pq.push(v, v) for v in values}
+        t_pq.update(handles[150], -1)
+        t_pq.update(handles[3], 500)
+        self.assertEqual(t_pq.remove(handles[10]), 10)
+        with self.assertRaises(ValueError):
+            t_pq.remove(handles[10])
+        self.assertEqual(t_pq.peek(), 150)
+        self.assertEqual(t_pq.peek_priority(), -1)
+        out = [t_pq.pop() for _ in range(0, t_pq.count())]
+        expected = [150] + [v for v in range(0, 200) if v not in (3, 10, 150)] + [3]
+        self.assertEqual(out, expected)
+        t_pq.push('a', 1)
+        t_pq.push('b', 1)
+        t_pq.push('c', 0)
+        self.assertEqual([t_pq.pop(), t_pq.pop(), t_pq.pop()], ['c', 'a', 'b'])
+
+    def test_timer_wheel(self):
+        wheel = TimerWheel(slots=4, levels=2)
+        fired = []
+        for tick in (1, 3, 4, 5, 15, 16, 17, 40, 100):
+            wheel.schedule(tick, fired.append, tick)
+        cancelled = wheel.schedule(9, fired.append, 9)
+        wheel.cancel(cancelled)
+        wheel.cancel(cancelled)
+        self.assertEqual(wheel.count(), 9)
+        wheel.schedule_in(2, lambda: wheel.schedule(0, fired.append, 'late'))
+        seen = []
+        for _ in range(0, 120):
+            wheel.advance()
+            seen.append((wheel.now, list(fired)))
+            del fired[:]
+        fired_at = {}
+        for now, values in seen:
+            for v in values:
+                fired_at[v] = now
+        self.assertEqual(fired_at, {1: 1, 3: 3, 4: 4, 5: 5, 15: 15, 16: 16, 17: 17, 40: 40, 100: 100, 'late': 3})
+        self.assertEqual(wheel.count(), 0)
+        self.assertEqual(wheel.advance(10), 0)
+
+    def test_object_pool(self):
+        created = []
+
+        def factory():
+            created.append(1)
+            return {'alive': False}
+
+        def reset(obj):
+            obj['alive'] = False
+
+        pool = ObjectPool(factory, 2, reset, max_size=5, grow_by=2)
+        self.assertEqual(len(created), 2)
+        a = pool.acquire()
+        a['alive'] = True
+        b = pool.acquire()
+        c = pool.acquire()
+        self.assertEqual(len(created), 4)
+        pool.release(a)
+        self.assertFalse(a['alive'])
+        self.assertIs(pool.acquire(), a)
+        d = pool.acquire()
+        e = pool.acquire()
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+        for obj in (b, c, d, e):
+            pool.release(obj)
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 5)
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['high_water'], 5)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(pool.count(), 4)
+        with self.assertRaises(ValueError):
+            pool.release(b)
+        with self.assertRaises(ValueError):
+            pool.release({'alive': False})
+        self.assertEqual(pool.stats()['in_use'], 1)
+        self.assertEqual(pool.count(), 4)
+
+    def test_spatial_hash(self):
+        grid = SpatialHash(32)
+        rng = random.Random(2)
+        rects = {i: Rect(rng.randint(-200, 200), rng.randint(-200, 200), rng.randint(0, 70), rng.randint(1, 70))
+                 for i in range(0, 150)}
+        for i, r in rects.items():
+            grid.insert(i, r)
+        for i in range(0, 150, 3):
+            rects[i] = rects[i].move(rng.randint(-50, 50), rng.randint(-50, 50))
+            grid.move(i, rects[i])
+        for i in range(0, 150, 10):
+            grid.remove(i)
+            del rects[i]
+        self.assertEqual(len(grid), len(rects))
+        self.assertNotIn(0, grid)
+        expected = set()
+        keys = sorted(rects)
+        for n, a in enumerate(keys):
+            for b in keys[n + 1:]:
+                if rects[a].colliderect(rects[b]):
+                    expected.add((a, b))
+        found = [tuple(sorted(p)) for p in grid.pairs()]
+        self.assertEqual(len(found), len(set(found)))
+        self.assertEqual(set(found), expected)
+        area = Rect(-40, -30, 90, 60)
+        self.assertEqual(sorted(grid.query_rect(area)), sorted(i for i in rects if rects[i].colliderect(area)))
+        self.assertEqual(sorted(grid.query_point(5, 7)), sorted(i for i in rects if rects[i].collidepoint(5, 7)))
+        near = grid.query_radius(0, 0, 40)
+        for i in rects:
+            if rects[i].collidepoint(0, 0):
+                self.assertIn(i, near)
+        for i in near:
+            self.assertTrue(rects[i].colliderect(Rect(-40, -40, 81, 81)))
+        grid.clear()
+        self.assertEqual(grid.count(), 0)
+        self.assertEqual(grid.query_point(5, 7), [])
+
+    def test_entity_table(self):
+        backends = [False]
+        if container.numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            table = EntityTable({'x': 'f', 'y': 'f', 'vx': 'f', 'vy': 'f', 'hp': 'i'}, capacity=2,
+                                use_numpy=use_numpy)
+            a = table.create(x=1, y=1, vx=10, vy=0, hp=5)
+            b = table.create(x=50, y=50, vx=0, vy=-20)
+            ids = table.create_many(3, x=[2, 3, 4], y=5, hp=1)
+            with self.assertRaises(KeyError):
+                table.create(x=1, vz=2)
+            with self.assertRaises(KeyError):
+                table.create_many(2, vz=2)
+            # bad values are rejected before any column changes, the same way on both backends
+            with self.assertRaises(TypeError):
+                table.create(x=2.0, hp=1.5)
+            with self.assertRaises(ValueError):
+                table.create_many(3, x=[1, 2])
+            with self.assertRaises(TypeError):
+                table.create_many(2, x=1, hp=[1.5, 2.5])
+            for name in ('x', 'y', 'vx', 'vy', 'hp'):
+                self.assertEqual(len(table.column(name)), 5)
+            self.assertEqual(len(table), 5)
+            self.assertEqual(table.ids(), [a, b] + ids)
+            table.integrate(0.5)
+            self.assertEqual(table.get(a, 'x'), 6)
+            self.assertEqual(table.get(b, 'y'), 40)
+            table.destroy(a)
+            self.assertNotIn(a, table)
+            self.assertEqual(table.row_of(ids[2]), 0)
+            self.assertEqual(table.get(ids[2], 'x'), 4)
+            table.set(ids[0], 'hp', 9)
+            self.assertEqual(table.get(ids[0], 'hp'), 9)
+            removed = table.cull(Rect(0, 0, 60, 60))
+            self.assertEqual(removed, [])
+            table.set(ids[2], 'x', -1)
+            table.set(ids[1], 'y', 100)
+            removed = table.cull(Rect(0, 0, 60, 60))
+            self.assertEqual(sorted(removed), sorted([ids[2], ids[1]]))
+            self.assertEqual(sorted(table.ids()), sorted([b, ids[0]]))
+            for eid in table.ids():
+                self.assertEqual(table.ids()[table.row_of(eid)], eid)
+            self.assertEqual(table.get(ids[0], 'hp'), 9)
+            self.assertEqual(list(table.column('hp')), [table.get(e, 'hp') for e in table.ids()])
+            self.assertEqual(table.create(), ids[2] + 1)
@@ -1,5 +1,10 @@
 import unittest
+import os
+import threading
+import time
 from manager import *
+import manager
+import pygame
 
 
 class TestContainer(unittest.TestCase):
@@ -62,3 +67,204 @@ class TestContainer(unittest.TestCase):
         self.assertFalse(cm.has_font('32'))
         cm.clear()
         self.assertFalse(cm.has_font('1'))
+
+    def test_lru_eviction(self):
+        cm = CachedManager(LRUPolicy(), max_entries=3)
+        for k in ('a', 'b', 'c'):
+            cm.add(k, k)
+        cm.get('a')
+        cm.add('d', 'd')
+        self.assertFalse(cm.has('b'))
+        self.assertTrue(cm.has('a'))
+        cm.pin('c')
+        cm.add('e', 'e')
+        cm.add('f', 'f')
+        self.assertTrue(cm.has('c'))
+        self.assertFalse(cm.has('a'))
+        self.assertFalse(cm.has('d'))
+        cm.unpin('c')
+        cm.add('g', 'g')
+        self.assertFalse(cm.has('c'))
+        self.assertEqual(CachedManager(max_entries=1)._policy.__class__, LRUPolicy)
+
+    def test_lfu_eviction(self):
+        cm = CachedManager(LFUPolicy(), max_entries=2)
+        cm.add('a', 1)
+        cm.add('b', 2)
+        cm.get('a')
+        cm.get('a')
+        cm.get('b')
+        cm.add('c', 3)
+        self.assertTrue(cm.has('a'))
+        self.assertFalse(cm.has('b'))
+        cm.get('c')
+        cm.get('c')
+        cm.get('c')
+        cm.add('d', 4)
+        self.assertFalse(cm.has('a'))
+        self.assertTrue(cm.has('c'))
+
+    def test_ttl_eviction(self):
+        now = [0.0]
+        cm = CachedManager(TTLPolicy(10, clock=lambda: now[0]))
+        cm.add('a', 1)
+        cm.pin('p')
+        cm.add('p', 2)
+        now[0] = 5.0
+        cm.add('b', 3)
+        self.assertEqual(cm.get('a'), 1)
+        now[0] = 11.0
+        self.assertIsNone(cm.get('a'))
+        self.assertEqual(cm.get('p'), 2)
+        self.assertTrue(cm.has('b'))
+        now[0] = 16.0
+        cm.add('c', 4)
+        self.assertFalse(cm.has('b'))
+        self.assertTrue(cm.has('p'))
+
+    def test_byte_budget(self):
+        pygame.init()
+        surfaces = [pygame.Surface((10, 10), 0, 32) for _ in range(0, 4)]
+        im = ImageManager(LRUPolicy(), max_bytes=1000)
+        im.add_image('0', surfaces[0])
+        im.add_image('1', surfaces[1])
+        self.assertEqual(im.size_bytes(), 800)
+        im.add_image('2', surfaces[2])
+        self.assertFalse(im.has_image('0'))
+        self.assertEqual(im.size_bytes(), 800)
+        im.add_image('1', surfaces[3])
+        self.assertEqual(im.size_bytes(), 800)
+        im.clear_cache()
+        self.assertEqual(im.size_bytes(), 0)
+        fm = FontManager(max_bytes=FONT_WEIGHT * 2)
+        for k in ('a', 'b', 'c'):
+            fm.add_font(k, k)
+        self.assertFalse(fm.has_font('a'))
+        self.assertEqual(fm.size_bytes(), FONT_WEIGHT * 2)
+        pygame.quit()
+
+    def test_get_or_load(self):
+        pygame.init()
+        pygame.display.set_mode((100, 100))
+        res_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_resources")
+        im = ImageManager()
+        img = im.get_or_load('test', res_dir, 'test.png')
+        self.assertEqual(type(img), pygame.Surface)
+        self.assertIs(im.get_or_load('test', res_dir, 'test.png'), img)
+        self.assertIs(im.get_or_load('other', res_dir, 'test.png'), img)
+        self.assertIs(im.get_image('other'), img)
+        self.assertIsNot(im.get_or_load(None, res_dir, 'test.png', (0, 0, 0)), img)
+        with self.assertRaises(FileNotFoundError):
+            im.get_or_load('missing', res_dir, 'missing.png')
+        # replacing or removing a loaded key forgets where it came from
+        replacement = pygame.Surface((4, 4))
+        im.add_image('test', replacement)
+        loaded = im.get_or_load('p2', res_dir, 'test.png')
+        self.assertIsNot(loaded, replacement)
+        im.remove('p2')
+        self.assertIsNot(im.get_or_load('p3', res_dir, 'test.png'), loaded)
+        small = ImageManager(max_entries=2)
+        for i in range(0, 20):
+            small.get_or_load(None, res_dir, 'test.png', (i, 0, 0))
+        self.assertEqual(len(small._loaded_from), 2)
+        self.assertEqual(len(small._load_ids), 2)
+        fm = FontManager()
+        font = fm.get_or_load('small', res_dir, 'trebuc', 12)
+        self.assertIs(fm.get_or_load(None, res_dir, 'trebuc.ttf', 12), font)
+        self.assertIsNot(fm.get_or_load(None, res_dir, 'trebuc.ttf', 14), font)
+        pygame.quit()
+
+    def test_get_or_load_concurrent(self):
+        calls = []
+        original = manager.load_image
+
+        def slow_load(image_dir, image_name, color_key=None, use_alpha=False):
+            calls.append(image_name)
+            time.sleep(0.05)
+            return object()
+
+        manager.load_image = slow_load
+        try:
+            im = ImageManager()
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(im.get_or_load(None, 'd', 'a.png')))
+                       for _ in range(0, 8)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        finally:
+            manager.load_image = original
+        self.assertEqual(calls, ['a.png'])
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(set(id(r) for r in results)), 1)
+
+    def test_stats(self):
+        cm = ImageManager(LRUPolicy(), max_entries=2)
+        self.assertIsNone(cm.stats())
+        snapshots = []
+        cm.enable_stats(snapshots.append, interval=0.000001)
+        cm.add_image('a', 1)
+        cm.add_image('b', 2)
+        cm.add_image('c', 3)
+        self.assertEqual(cm.get_image('c'), 3)
+        self.assertIsNone(cm.get_image('a'))
+        stats = cm.stats()
+        self.assertEqual(stats['manager'], 'ImageManager')
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['inserts'], 3)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertTrue(len(snapshots) > 0)
+        original = manager.load_image
+        manager.load_image = lambda *args: object()
+        try:
+            cm.get_or_load('d', 'dir', 'd.png')
+        finally:
+            manager.load_image = original
+        stats = cm.stats()
+        self.assertEqual(stats['loads'], 1)
+        self.assertEqual(sum(stats['load_histogram'].values()), 1)
+        cm.disable_stats()
+        self.assertIsNone(cm.stats())
+        self.assertNotIn('get', cm.__dict__)
+        self.assertEqual(cm.get_image('d'), cm.get('d'))
+
+    def test_variant_cache(self):
+        pygame.init()
+        im = ImageManager()
+        base = pygame.Surface((10, 20), pygame.SRCALPHA, 32)
+        base.fill((200, 100, 50, 255))
+        im.add_image('ship', base)
+        vc = VariantCache(im, max_bytes=3000, angle_steps=8)
+        self.assertIsNone(vc.get('nothing', angle=10))
+        self.assertIs(vc.get('ship'), base)
+        rotated = vc.get('ship', angle=44)
+        self.assertIs(vc.get('ship', angle=46), rotated)
+        self.assertIs(vc.get('ship', angle=405), rotated)
+        self.assertIsNot(vc.get('ship', angle=90), rotated)
+        w, h = vc.get('ship', angle=90).get_size()
+        self.assertTrue(w > h)
+        self.assertEqual(vc.get('ship', scale=2.0).get_size(), (20, 40))
+        tinted = vc.get('ship', tint='RED')
+        self.assertEqual(tuple(tinted.get_at((5, 5))), (200, 0, 0, 255))
+        self.assertEqual(tuple(base.get_at((5, 5))), (200, 100, 50, 255))
+        self.assertIs(vc.get('ship', tint=(255, 0, 0)), tinted)
+        self.assertTrue(vc.size_bytes() <= 3000)
+        flipped = vc.get('ship', flip_x=True)
+        im.add_image('rock', base)
+        rock = vc.get('rock', flip_y=True)
+        vc.invalidate('ship')
+        self.assertIsNot(vc.get('ship', flip_x=True), flipped)
+        self.assertIs(vc.get('rock', flip_y=True), rock)
+        # evicted variants leave nothing behind
+        for i in range(0, 200):
+            vc.get('ship', scale=1.0 + i / 100.0)
+        self.assertTrue(len(vc._variants.keys()) < 10)
+        with self.assertRaises(ValueError):
+            vc.get('ship', tint='NOT_A_COLOR')
+        vc.clear()
+        self.assertEqual(vc.size_bytes(), 0)
+        pygame.quit()
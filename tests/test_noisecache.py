@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+from noisecache import *
+from perlin2d import Perlin2D, FractalNoise
+
+
+class TestNoiseCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmp.name, "noise")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_store_and_load(self):
+        cache = NoiseCache(self.cache_dir)
+        self.assertIsNone(cache.load(16, 8, 1, octaves=2))
+        data = bytearray(range(0, 128))
+        cache.store(data, 16, 8, 1, octaves=2)
+        loaded = cache.load(16, 8, 1, octaves=2)
+        self.assertEqual(bytes(loaded), bytes(data))
+        self.assertIsNone(cache.load(16, 8, 1, octaves=3))
+        self.assertIsNone(cache.load(16, 8, 2, octaves=2))
+        with self.assertRaises(ValueError):
+            cache.store(bytearray(10), 16, 8, 1)
+        self.assertEqual(os.listdir(self.cache_dir), [cache.key(16, 8, 1, octaves=2) + ".noise"])
+
+    def test_generators(self):
+        cache = NoiseCache(self.cache_dir)
+        m = cache.perlin2d(20, 10, 3)
+        with self.assertRaises(ValueError):
+            cache.perlin2d(20, 10, None)
+        self.assertEqual(bytes(m), bytes(Perlin2D(20, 10, seed=3).noise_map))
+        fractal = FractalNoise(seed=4, octaves=2)
+        m = cache.fractal(fractal, 12, 12)
+        self.assertEqual(bytes(m), bytes(fractal.generate(12, 12)))
+        calls = []
+        cache.get_or_create(12, 12, 4, lambda: calls.append(1), kind='fractal', octaves=2,
+                            frequency=fractal.frequency, lacunarity=fractal.lacunarity,
+                            persistence=fractal.persistence, x_offset=0, y_offset=0)
+        self.assertEqual(calls, [])
+
+    def test_eviction(self):
+        cache = NoiseCache(self.cache_dir, max_bytes=2 * (100 + 16))
+        first = cache.store(bytearray(100), 10, 10, 1)
+        os.utime(first, (1, 1))
+        second = cache.store(bytearray(100), 10, 10, 2)
+        os.utime(second, (2, 2))
+        cache.load(10, 10, 1)
+        cache.store(bytearray(100), 10, 10, 3)
+        self.assertIsNotNone(cache.load(10, 10, 1))
+        self.assertIsNone(cache.load(10, 10, 2))
+        self.assertIsNotNone(cache.load(10, 10, 3))
+        self.assertEqual(cache.size(), 2 * (100 + 16))
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
@@ -0,0 +1,63 @@
+import unittest
+from noisesurface import *
+from perlin2d import Perlin2D
+import rgbcolor
+import pygame
+from pygame import Surface
+
+
+class TestNoiseSurface(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pygame.init()
+        self.stops = [(90, 'DARK_BLUE'), (110, 'SANDY_BROWN'), (180, 'FOREST_GREEN'), (255, 'SNOW')]
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_build_palette(self):
+        p = build_palette(self.stops)
+        self.assertEqual(len(p), 256)
+        self.assertEqual(p[0], tuple(rgbcolor.DARK_BLUE)[:3])
+        self.assertEqual(p[90], tuple(rgbcolor.DARK_BLUE)[:3])
+        self.assertEqual(p[91], tuple(rgbcolor.SANDY_BROWN)[:3])
+        self.assertEqual(p[255], tuple(rgbcolor.SNOW)[:3])
+        g = build_palette([(0, rgbcolor.BLACK), (255, 'white')], mode='gradient')
+        self.assertEqual(g[0], (0, 0, 0))
+        self.assertEqual(g[255], (255, 255, 255))
+        self.assertEqual(g[51], (51, 51, 51))
+        with self.assertRaises(ValueError):
+            build_palette([(10, 'NOT_A_COLOR')])
+        with self.assertRaises(ValueError):
+            build_palette(self.stops, mode='spline')
+
+    def test_rgbcolor_resolve(self):
+        self.assertEqual(rgbcolor.resolve('dark_blue'), rgbcolor.DARK_BLUE)
+        self.assertIsNot(rgbcolor.resolve('DARK_BLUE'), rgbcolor.DARK_BLUE)
+        self.assertEqual(rgbcolor.resolve((1, 2, 3)), pygame.Color(1, 2, 3, 255))
+        with self.assertRaises(ValueError):
+            rgbcolor.resolve('resolve')
+        with self.assertRaises(ValueError):
+            rgbcolor.resolve('NOT_A_COLOR')
+
+    def test_noise_to_surface(self):
+        perlin = Perlin2D(40, 30, use_numpy=False, seed=7)
+        palette = build_palette(self.stops)
+        s = noise_to_surface(perlin.noise_map, 40, 30, palette)
+        self.assertEqual(type(s), Surface)
+        self.assertEqual(s.get_size(), (40, 30))
+        for x, y in ((0, 0), (39, 0), (5, 17), (39, 29)):
+            self.assertEqual(tuple(s.get_at((x, y)))[:3], palette[perlin.noise_map[y*40+x]])
+        with self.assertRaises(ValueError):
+            noise_to_surface(perlin.noise_map, 40, 31, palette)
+        vector = Perlin2D(40, 30, seed=7)
+        s = noise_to_surface(vector.noise_map, 40, 30, palette)
+        self.assertEqual(tuple(s.get_at((5, 17)))[:3], palette[perlin.noise_map[17*40+5]])
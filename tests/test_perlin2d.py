@@ -0,0 +1,111 @@
+import unittest
+from perlin2d import *
+import perlin2d
+
+
+class TestPerlin2D(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_scalar_noise_map(self):
+        p = Perlin2D(24, 16, use_numpy=False)
+        self.assertEqual(len(p.noise_map), 24 * 16)
+        for v in p.noise_map:
+            self.assertTrue(0 <= v <= 255)
+
+    @unittest.skipIf(perlin2d.numpy is None, "NumPy is not installed")
+    def test_numpy_matches_scalar(self):
+        p = Perlin2D(37, 21, use_numpy=True)
+        self.assertEqual(p.noise_map.dtype, perlin2d.numpy.uint8)
+        self.assertEqual(len(p.noise_map), 37 * 21)
+        self.assertEqual(p.noise_map.tolist(), list(p._generate_scalar()))
+        f = p._generate_numpy('float32')
+        self.assertEqual(f.dtype, perlin2d.numpy.float32)
+        self.assertTrue(abs(f - p.noise_map).max() <= 0.5)
+
+    def test_seed(self):
+        p = Perlin2D(30, 20, use_numpy=False, seed=42)
+        self.assertEqual(type(p.noise_map), bytearray)
+        self.assertEqual(p.gradient_table.itemsize, 4)
+        self.assertEqual(len(p.gradient_table), p.grid_w * p.grid_h * 2)
+        self.assertEqual(p.noise_map, Perlin2D(30, 20, use_numpy=False, seed=42).noise_map)
+        self.assertNotEqual(p.noise_map, Perlin2D(30, 20, use_numpy=False, seed=43).noise_map)
+        view = p.buffer()
+        self.assertEqual(view.nbytes, 30 * 20)
+        self.assertEqual(view[5], p.noise_map[5])
+        if perlin2d.numpy is not None:
+            self.assertEqual(Perlin2D(30, 20, use_numpy=True, seed=42).noise_map.tolist(), list(p.noise_map))
+            self.assertEqual(p.as_surfarray().shape, (30, 20))
+            self.assertEqual(p.as_surfarray()[7][3], p.noise_map[3*30+7])
+            f = Perlin2D(8, 4, use_numpy=True, dtype='float32', seed=42)
+            self.assertEqual(f.as_surfarray().shape, (8, 4))
+            self.assertEqual(f.as_surfarray().dtype, perlin2d.numpy.float32)
+            self.assertEqual(f.as_surfarray()[5][2], f.noise_map[2*8+5])
+            view = p.as_surfarray()
+            p.noise_map[3*30+7] = 200
+            self.assertEqual(view[7][3], 200)
+
+    def test_perlin_chunks(self):
+        big = PerlinChunks(16, seed=3, use_numpy=False)
+        small = PerlinChunks(8, seed=3, use_numpy=False)
+        b = big.chunk(-1, 0)
+        for cy in range(0, 2):
+            for cx in range(-2, 0):
+                c = small.chunk(cx, cy)
+                for y in range(0, 8):
+                    for x in range(0, 8):
+                        self.assertEqual(c[y*8+x], b[(cy*8+y)*16 + (cx+2)*8+x])
+        self.assertNotEqual(bytes(PerlinChunks(16, seed=4, use_numpy=False).chunk(-1, 0)), bytes(b))
+        cache = PerlinChunks(8, seed=3, cache_bytes=8*8*2, use_numpy=False)
+        first = cache.chunk(0, 0)
+        self.assertIs(cache.chunk(0, 0), first)
+        cache.chunk(1, 0)
+        cache.chunk(0, 0)
+        cache.chunk(2, 0)
+        self.assertTrue(cache.is_cached(0, 0))
+        self.assertFalse(cache.is_cached(1, 0))
+        self.assertEqual(cache.cached_bytes(), 8*8*2)
+        cache.discard(0, 0)
+        self.assertEqual(cache.cached_bytes(), 8*8)
+        cache.clear()
+        self.assertFalse(cache.is_cached(2, 0))
+
+    @unittest.skipIf(perlin2d.numpy is None, "NumPy is not installed")
+    def test_perlin_chunks_numpy_matches_scalar(self):
+        scalar = PerlinChunks(24, seed=11, use_numpy=False)
+        vector = PerlinChunks(24, seed=11, use_numpy=True)
+        for cx, cy in ((0, 0), (-3, 2), (5, -7)):
+            self.assertEqual(vector.chunk(cx, cy).tolist(), list(scalar.chunk(cx, cy)))
+
+    def test_fractal_noise(self):
+        fractal = FractalNoise(seed=5, octaves=3, use_numpy=False)
+        m = fractal.generate(20, 10, band_rows=4)
+        self.assertEqual(len(m), 20 * 10)
+        self.assertEqual(bytes(m), bytes(fractal.generate(20, 10, band_rows=100)))
+        self.assertEqual(bytes(m), bytes(fractal.generate(20, 10, workers=2, band_rows=3)))
+        shifted = fractal.generate(10, 5, x_offset=10, y_offset=5)
+        for y in range(0, 5):
+            self.assertEqual(bytes(shifted[y*10:(y+1)*10]), bytes(m[(y+5)*20+10:(y+6)*20]))
+        single = FractalNoise(seed=5, octaves=1, use_numpy=False).generate(8, 8)
+        self.assertEqual(bytes(single), bytes(PerlinChunks(8, seed=5, use_numpy=False).chunk(0, 0)))
+        if perlin2d.numpy is not None:
+            vector = FractalNoise(seed=5, octaves=3, use_numpy=True)
+            self.assertEqual(vector.generate(20, 10, workers=2, band_rows=3).tolist(), list(m))
+            # high octave counts only hash the sampled corners, not the lattice span between them
+            deep = FractalNoise(seed=5, octaves=12, use_numpy=True).generate(512, 128)
+            self.assertEqual(deep.shape, (512 * 128,))
+            scalar = FractalNoise(seed=5, octaves=12, use_numpy=False).generate(16, 4, x_offset=300, y_offset=60)
+            window = FractalNoise(seed=5, octaves=12, use_numpy=True).generate(16, 4, x_offset=300, y_offset=60)
+            self.assertEqual(window.tolist(), list(scalar))
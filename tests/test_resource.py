@@ -1,7 +1,11 @@
 import unittest
 import os
+import shutil
+import tempfile
+from concurrent.futures import CancelledError
+import time
 from resource import *
-from manager import ImageManager
+from manager import ImageManager, FontManager
 import pygame
 from pygame import Surface, Rect
 from pygame.font import Font
@@ -72,3 +76,166 @@ class TestContainer(unittest.TestCase):
         self.assertTrue(m.get('dark_red'), type(Rect))
         self.assertTrue(m.get('brown'), type(Rect))
         self.assertTrue(m.get('light_grey'), type(Rect))
+
+    def test_load_sprite_sheet_map(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = os.path.join(tmp, "map.json")
+            shutil.copy(self.test_map, json_file)
+            m = load_sprite_sheet_map(json_file)
+            self.assertTrue(os.path.isfile(json_file + ".bin"))
+            self.assertEqual(0, len(m._rects))
+            self.assertEqual(load_sprite_sheet_map_from_json(json_file), dict(m))
+            self.assertEqual(Rect(32, 0, 32, 32), m['dark_red'])
+            self.assertIs(m['dark_red'], m['dark_red'])
+            self.assertNotIn('missing', m)
+            with self.assertRaises(KeyError):
+                m['missing']
+            images = load_sprite_sheet(load_image(self.test_res_dir, self.test_image), m)
+            self.assertEqual((32, 32), images['brown'].get_size())
+            m.close()
+            # a touched but unchanged JSON keeps the compiled map
+            st = os.stat(json_file + ".bin")
+            os.utime(json_file, ns=(st.st_mtime_ns + 10**9, st.st_mtime_ns + 10**9))
+            m = load_sprite_sheet_map(json_file)
+            self.assertEqual(st.st_ino, os.stat(json_file + ".bin").st_ino)
+            m.close()
+            # changed JSON is recompiled
+            with open(json_file, "w") as handle:
+                handle.write('{"only": {"x": 1, "y": 2, "w": 3, "h": 4}}')
+            os.utime(json_file, ns=(st.st_mtime_ns + 2 * 10**9, st.st_mtime_ns + 2 * 10**9))
+            m = load_sprite_sheet_map(json_file)
+            self.assertEqual({'only': Rect(1, 2, 3, 4)}, dict(m))
+            m.close()
+        with self.assertRaises(FileNotFoundError):
+            load_sprite_sheet_map(os.path.join(self.test_res_dir, "missing.json"))
+
+    def test_load_images(self):
+        manifest = {
+            'plain': (self.test_res_dir, self.test_image),
+            'alpha': (self.test_res_dir, self.test_image, None, True),
+            'keyed': (self.test_res_dir, self.test_image, (0, 0, 0)),
+            'missing': (self.test_res_dir, "missing.png"),
+            'broken': (self.test_res_dir, "test_map.json"),
+        }
+        report = load_images(manifest, self.test_im, max_workers=2)
+        self.assertFalse(report.ok)
+        self.assertEqual({'plain', 'alpha', 'keyed'}, set(report.assets.keys()))
+        self.assertEqual(['missing', 'broken'], [key for key, _ in report.failures])
+        self.assertIsInstance(report.failures[0][1], FileNotFoundError)
+        self.assertEqual(set(manifest.keys()), set(report.timings.keys()))
+        self.assertEqual(5, len(report.slowest()))
+        self.assertEqual(2, len(report.slowest(2)))
+        self.assertEqual((0, 0, 0, 255), report.assets['keyed'].get_colorkey())
+        self.assertTrue(self.test_im.has_image('plain'))
+        self.assertFalse(self.test_im.has_image('missing'))
+        with self.assertRaises(RuntimeError):
+            report.raise_failures()
+
+    def test_load_fonts(self):
+        report = load_fonts({'small': (self.test_res_dir, self.test_font_no_ext, 12),
+                             'large': (self.test_res_dir, self.test_font, 24),
+                             'missing': (self.test_res_dir, "missing", 12)})
+        self.assertEqual({'small', 'large'}, set(report.assets.keys()))
+        self.assertIsInstance(report.assets['large'], Font)
+        self.assertEqual(['missing'], [key for key, _ in report.failures])
+        report = load_fonts({'small': (self.test_res_dir, self.test_font, 12)})
+        self.assertTrue(report.ok)
+        report.raise_failures()
+
+    def test_asset_prefetcher(self):
+        progress = []
+        fm = FontManager()
+        prefetcher = AssetPrefetcher(self.test_im, fm, max_workers=2,
+                                     progress=lambda done, total, key: progress.append((done, total, key)))
+        futures = prefetcher.prefetch(images={'sheet': (self.test_res_dir, self.test_image),
+                                              'keyed': (self.test_res_dir, self.test_image, (0, 0, 0), True),
+                                              'missing': (self.test_res_dir, "FAKE_IMAGE")},
+                                      fonts={'font': (self.test_res_dir, self.test_font_no_ext, 12)})
+        self.assertEqual(prefetcher.pending(), 4)
+        self.assertTrue(prefetcher.finish(timeout=10))
+        prefetcher.shutdown()
+        self.assertEqual(type(futures['sheet'].result()), Surface)
+        self.assertIs(self.test_im.get_image('sheet'), futures['sheet'].result())
+        self.assertEqual(self.test_im.get_image('keyed').get_colorkey(), (0, 0, 0, 255))
+        self.assertEqual(type(fm.get_font('font')), Font)
+        with self.assertRaises(FileNotFoundError):
+            futures['missing'].result()
+        self.assertFalse(self.test_im.has_image('missing'))
+        self.assertEqual([p[0] for p in progress], [1, 2, 3, 4])
+        self.assertEqual(progress[-1][1], 4)
+        again = AssetPrefetcher(self.test_im).prefetch(images={'sheet': (self.test_res_dir, self.test_image)})
+        self.assertIs(again['sheet'].result(), self.test_im.get_image('sheet'))
+        # shutting down before pump() cancels what was queued
+        stopped = AssetPrefetcher(self.test_im, max_workers=1)
+        futures = stopped.prefetch(images={'a': (self.test_res_dir, self.test_image),
+                                           'b': (self.test_res_dir, self.test_image)})
+        stopped.shutdown()
+        self.assertEqual(stopped.pending(), 0)
+        self.assertTrue(stopped.finish(timeout=1))
+        for future in futures.values():
+            with self.assertRaises(CancelledError):
+                future.result(timeout=1)
+        self.assertFalse(self.test_im.has_image('a'))
+
+    def test_asset_watcher(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in (self.test_image, "test_map.json", self.test_font):
+                shutil.copy(os.path.join(self.test_res_dir, name), tmp)
+            shutil.copy(os.path.join(self.test_res_dir, self.test_image), os.path.join(tmp, "solo.png"))
+            json_file = os.path.join(tmp, "test_map.json")
+            reloads = []
+            fm = FontManager()
+            watcher = AssetWatcher(self.test_im, fm, interval=0.01, on_reload=reloads.append)
+            self.assertEqual((64, 64), watcher.watch_image('solo', tmp, "solo.png").get_size())
+            images = watcher.watch_sprite_sheet('tiles', tmp, self.test_image, json_file)
+            self.assertEqual(4, len(images))
+            self.assertIs(images['brown'], self.test_im.get_image('brown'))
+            font = watcher.watch_font('font', tmp, self.test_font_no_ext, 12)
+            self.assertIs(font, fm.get_font('font'))
+            self.assertEqual(4, len(watcher.watched_files()))
+            self.assertEqual(0, watcher.poll())
+            self.assertEqual([], watcher.pump())
+
+            def touch(full_path):
+                st = os.stat(full_path)
+                os.utime(full_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+            # a new map re-cuts only the sheet's children
+            with open(json_file, "w") as handle:
+                handle.write('{"dark_red": {"x": 32, "y": 0, "w": 16, "h": 16},'
+                             ' "new": {"x": 0, "y": 0, "w": 8, "h": 8}}')
+            touch(json_file)
+            solo = self.test_im.get_image('solo')
+            self.assertEqual(1, watcher.poll())
+            self.assertEqual({'dark_grey', 'brown', 'light_grey', 'dark_red', 'new'}, set(watcher.pump()))
+            self.assertEqual((16, 16), self.test_im.get_image('dark_red').get_size())
+            self.assertEqual((8, 8), self.test_im.get_image('new').get_size())
+            self.assertFalse(self.test_im.has_image('brown'))
+            self.assertIs(solo, self.test_im.get_image('solo'))
+            self.assertIs(font, fm.get_font('font'))
+            # a changed image reloads only that key
+            pygame.image.save(Surface((10, 10)), os.path.join(tmp, "solo.png"))
+            touch(os.path.join(tmp, "solo.png"))
+            dark_red = self.test_im.get_image('dark_red')
+            self.assertEqual(1, watcher.poll())
+            self.assertEqual(['solo'], watcher.pump())
+            self.assertEqual((10, 10), self.test_im.get_image('solo').get_size())
+            self.assertIs(dark_red, self.test_im.get_image('dark_red'))
+            self.assertEqual(['solo'], reloads[-1])
+            # the background thread picks up a changed font
+            watcher.start()
+            touch(os.path.join(tmp, self.test_font))
+            for _ in range(0, 200):
+                if watcher.pump():
+                    break
+                time.sleep(0.01)
+            watcher.stop()
+            self.assertIsNot(font, fm.get_font('font'))
+            self.assertEqual(['font'], reloads[-1])
+            # deleted and unwatched files are left alone
+            os.remove(os.path.join(tmp, "solo.png"))
+            self.assertEqual(0, watcher.poll())
+            watcher.unwatch('tiles')
+            touch(json_file)
+            self.assertEqual(0, watcher.poll())
+            self.assertEqual(2, len(watcher.watched_files()))
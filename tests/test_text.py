@@ -0,0 +1,68 @@
+import unittest
+import os
+from text import *
+from manager import FontManager
+from resource import load_font
+import pygame
+from pygame import Surface, Rect
+
+
+class TestText(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pygame.init()
+        self._d = pygame.display.set_mode((100, 100))
+        self.test_res_dir = os.path.join(os.getcwd(), "test_resources")
+        self.font = load_font(self.test_res_dir, "trebuc", 16)
+        self.fm = FontManager()
+        self.fm.add_font('hud', self.font)
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_text_renderer(self):
+        renderer = TextRenderer(self.fm, max_entries=2)
+        label = renderer.render('hud', "Score", 'WHITE')
+        self.assertIs(label, renderer.render('hud', "Score", (255, 255, 255)))
+        self.assertIsNot(label, renderer.render('hud', "Score", 'WHITE', antialias=False))
+        renderer.render('hud', "Lives", 'WHITE')
+        # LRU limit of 2 drops the oldest string
+        self.assertIsNot(label, renderer.render('hud', "Score", 'WHITE'))
+        self.assertGreater(renderer.size_bytes(), 0)
+        # cached strings are exactly what Font.render draws
+        expected = self.font.render("Score", True, (255, 255, 255))
+        self.assertEqual(expected.get_size(), label.get_size())
+        self.assertEqual(pygame.image.tostring(expected, 'RGBA'), pygame.image.tostring(label, 'RGBA'))
+        self.assertEqual(self.font.size("1234"), renderer.size('hud', "1234"))
+        target = Surface((100, 40))
+        rect = renderer.draw(target, 'hud', "99", (3, 4), 'RED')
+        self.assertEqual(Rect((3, 4), renderer.size('hud', "99")), rect)
+        keys = renderer._strings.keys()
+        rect = renderer.draw(target, 'hud', "12345", (0, 0), 'RED', cache=False)
+        self.assertEqual(renderer.size('hud', "12345"), rect.size)
+        self.assertEqual(keys, renderer._strings.keys())
+        with self.assertRaises(KeyError):
+            renderer.render('missing', "x", 'WHITE')
+        with self.assertRaises(ValueError):
+            renderer.render('hud', "x", 'NOT_A_COLOR')
+        label = renderer.render('hud', "Score", 'WHITE')
+        renderer.invalidate('hud')
+        self.assertIsNot(label, renderer.render('hud', "Score", 'WHITE'))
+        # many distinct strings and colours stay within the LRU limit
+        for i in range(0, 100):
+            renderer.render('hud', str(i), (i, 255 - i, 0))
+        self.assertEqual(2, len(renderer._strings.keys()))
+        renderer.clear()
+        self.assertEqual(0, renderer.size_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Text rendering on top of FontManager.
+
+TextRenderer keeps an LRU cache of rendered strings keyed by (font key, text, colour, antialias), so labels, menu
+entries and HUD text that repeats are rendered once and then only blitted.  Text that changes every frame (scores,
+timers) is better drawn with cache=False, which goes straight to Font.render without churning the cache.
+
+Composing strings from a pre-rendered glyph atlas was measured and dropped: with pygame 2 one Font.render call is
+cheaper than blitting the glyphs one by one for every string length tried, see benchmarks/bench_text.py.
+"""
+import rgbcolor
+from manager import CachedManager, LRUPolicy, surface_weight
+
+
+class TextRenderer(object):
+    """
+    Renders text with the fonts of a FontManager
+
+    render() returns cached Surfaces from an LRU CachedManager; a miss renders the string with Font.render, so
+    cached text matches Font.render exactly, kerning included.  Colours can be rgbcolor names such as 'WHITE' or
+    anything pygame.Color accepts.
+    """
+
+    def __init__(self, font_manager, max_entries=256, max_bytes=8*1024*1024):
+        self.font_manager = font_manager
+        self._strings = CachedManager(LRUPolicy(), max_entries=max_entries, max_bytes=max_bytes,
+                                      weigher=surface_weight)
+
+    def _font(self, font_key):
+        font = self.font_manager.get_font(font_key)
+        if font is None:
+            raise KeyError("Font {} is not in the FontManager".format(font_key))
+        return font
+
+    def render(self, font_key, text, color, antialias=True):
+        """
+        Return a Surface of text from the string cache, rendering it with Font.render on a miss.  The Surface is
+        shared, copy it before drawing on it.
+        :param font_key: key of the font in the FontManager
+        :param text: str
+        :param color: rgbcolor name or colour
+        :param antialias: bool
+        :return: pygame.Surface
+        """
+        color = tuple(rgbcolor.resolve(color))
+        key = (font_key, text, color, antialias)
+        surface = self._strings.get(key)
+        if surface is None:
+            surface = self._font(font_key).render(text, antialias, color)
+            self._strings.add(key, surface)
+        return surface
+
+    def draw(self, target, font_key, text, pos, color, antialias=True, cache=True):
+        """
+        Blit text onto target
+        :param target: pygame.Surface
+        :param pos: (x, y) of the top left corner
+        :param cache: False renders without touching the string cache, for text that changes every frame
+        :return: pygame.Rect covering the text
+        """
+        if cache:
+            surface = self.render(font_key, text, color, antialias)
+        else:
+            surface = self._font(font_key).render(text, antialias, tuple(rgbcolor.resolve(color)))
+        return target.blit(surface, pos)
+
+    def size(self, font_key, text):
+        """
+        Return the size text is drawn at, the same for every colour
+        :return: (int, int)
+        """
+        return self._font(font_key).size(text)
+
+    def invalidate(self, font_key):
+        """
+        Drop the cached strings of a font, e.g. after it was replaced in the FontManager
+        :param font_key: key of the font in the FontManager
+        :return: None
+        """
+        for key in self._strings.keys():
+            if key[0] == font_key:
+                self._strings.remove(key)
+
+    def size_bytes(self):
+        """
+        Return the estimated memory used by cached strings
+        :return: int
+        """
+        return self._strings.size_bytes()
+
+    def clear(self):
+        """
+        Drop every cached string
+        :return: None
+        """
+        self._strings.clear()